@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput/latency benchmark against the local stub server
+Reports profiles/sec, p50/p99 fetch latency, per-phase means, bytes read and peak RSS
+"""
+
+import argparse
+import time
+
+from common import percentile, peak_rss_mb, emit
+from stub_server import StubTikTokServer
+from stub_proxy import StubProxyServer
+
+import tiktok
+
+# ============================================
+# BENCHMARK
+# ============================================
+def run(args, base_url, proxy_urls=()):
+    """Scrape args.profiles identifiers and return the report dict"""
+    fixtures = args.mix.split(',')
+    identifiers = [fixtures[i % len(fixtures)] for i in range(args.profiles)]
+    
+    pool = tiktok.ProxyPool(proxy_urls, args.proxy_concurrency) if proxy_urls else None
+    scraper = tiktok.TikTokScraper(use_colors=False, stream=not args.no_stream, base_url=base_url, quiet=True, proxies=pool)
+    metrics = tiktok.BatchMetrics()
+    latencies = []
+    succeeded = failed = 0
+    start = time.perf_counter()
+    if args.sequential:
+        results = ((i, identifier, scraper.fetch_user_info(identifier)) for i, identifier in enumerate(identifiers, 1))
+    else:
+        engine = tiktok.BatchEngine(scraper, args.concurrency, args.delay, args.parse_workers, args.max_rate, args.attempts)
+        results = engine.run(identifiers)
+    for _, _, user_data in results:
+        metrics.observe(user_data)
+        latencies.append(user_data['metrics']['phases']['total'])
+        if "error" in user_data:
+            failed += 1
+        else:
+            succeeded += 1
+    elapsed = time.perf_counter() - start
+    scraper.close()
+    
+    mode = 'sequential' if args.sequential else f"batch x{args.concurrency}"
+    if args.parse_workers and not args.sequential:
+        mode += f" + {args.parse_workers} parse procs"
+    if pool:
+        mode += f" via {len(pool)} proxies"
+    report = {
+        'mode': mode,
+        'profiles': args.profiles,
+        'succeeded': succeeded,
+        'failed': failed,
+        'elapsed_s': elapsed,
+        'profiles_per_s': args.profiles / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+        'bytes_received': metrics.bytes_received,
+        'throttled': metrics.throttled,
+        'refetches': metrics.refetches,
+        'phases': metrics.summary_line(),
+    }
+    if pool:
+        # Share of requests each proxy served; unhealthy ones should fall behind
+        report['proxy_requests'] = ' '.join(f"{proxy['requests']}/{proxy['failures']}f/{proxy['ejections']}e" for proxy in pool.stats())
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fetch_user_info against a local stub server")
+    parser.add_argument("--profiles", type=int, default=500, help="Profiles to fetch (default: 500)")
+    parser.add_argument("--mix", default="large,private,minimal,legacy", help="Comma-separated fixtures to cycle through")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--parse-workers", type=int, default=0, help="Parse in worker processes (default: 0, parse on fetch threads)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Per-host pacing interval (default: 0)")
+    parser.add_argument("--sequential", action="store_true", help="Use a plain loop instead of BatchEngine")
+    parser.add_argument("--no-stream", action="store_true", help="Download whole pages")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response latency in seconds (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Stub answers 429 above this many requests/s (default: off)")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Fraction of stub responses that are captcha pages")
+    parser.add_argument("--max-rate", type=float, help="Client-side requests/s cap per host")
+    parser.add_argument("--attempts", type=int, default=4, help="Tries per profile (default: 4)")
+    parser.add_argument("--proxies", type=int, default=0, help="Route requests through this many local stand-in proxies (default: 0)")
+    parser.add_argument("--bad-proxies", type=int, default=0, help="How many of --proxies fail most requests (default: 0)")
+    parser.add_argument("--slow-proxies", type=int, default=0, help="How many of the healthy --proxies add --proxy-latency (default: 0)")
+    parser.add_argument("--proxy-latency", type=float, default=0.1, help="Extra seconds added by slow proxies (default: 0.1)")
+    parser.add_argument("--proxy-concurrency", type=int, default=4, help="Requests in flight per proxy (default: 4)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    
+    server = StubTikTokServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              error_status=args.error_status, seed=315, rate_limit=args.rate_limit,
+                              captcha_rate=args.captcha_rate).start()
+    proxies = []
+    for i in range(args.proxies):
+        bad = i < args.bad_proxies
+        slow = not bad and i < args.bad_proxies + args.slow_proxies
+        proxies.append(StubProxyServer(latency=args.proxy_latency if slow else 0.0, error_rate=0.6 if bad else 0.0,
+                                       drop_rate=0.3 if bad else 0.0, seed=315 + i).start())
+    try:
+        report = run(args, server.base_url, [proxy.url for proxy in proxies])
+        report['server_requests'] = server.requests
+        report['server_429s'] = server.limited
+    finally:
+        for proxy in proxies:
+            proxy.shutdown()
+        server.shutdown()
+    emit(report, args.json)
+
+if __name__ == "__main__":
+    main()
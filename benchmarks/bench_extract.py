@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the profile page extraction functions
+Checks what _extract_data makes of each fixture, then runs every extractor over
+every fixture and reports per-call timings
+"""
+
+import argparse
+import sys
+import time
+
+from common import load_fixtures, percentile, peak_rss_mb, emit
+
+import tiktok
+
+# ============================================
+# BENCHMARKS
+# ============================================
+def extractors(scraper):
+    """Name -> callable(html) for each measured function"""
+    return {
+        '_extract_data': scraper._extract_data,
+        '_extract_state_fields': scraper._extract_state_fields,
+        '_extract_regex_fields': scraper._extract_regex_fields,
+        '_extract_social_links': lambda html: scraper._extract_social_links(html, SAMPLE_BIO),
+    }
+
+SAMPLE_BIO = "Official account 🎵\nig: @sample.official | yt: samplechannel\nbiz: hi@sample.com\ntwitter @sampletweets"
+
+# Fixture -> expected unique_id, or the start of the expected error
+EXPECTED = {
+    'large': 'large',
+    'minimal': 'minimal',
+    'private': 'private',
+    'malformed': 'malformed',
+    'legacy': 'legacy',
+    'notfound': 'error: User not found (statusCode 10221',
+}
+
+# Bio -> expected social links; ordinary words must not be read as platform keywords
+BIO_CASES = {
+    SAMPLE_BIO: ['instagram:sample.official', 'twitter:sampletweets', 'youtube:samplechannel', 'email:hi@sample.com'],
+    "since 2024 · sc 2024 · snap back · insta vibes · youtube fan · facebook friends": [],
+    "biggest fan of the big stage": [],
+    "snapchat: snappy.one | fb: face.book | telegram @tgname": ['snapchat:snappy.one', 'facebook:face.book', 'telegram:tgname'],
+}
+
+def check_bios():
+    """Mismatches between social_links_from_bio and BIO_CASES, as readable lines"""
+    problems = []
+    for bio, expected in BIO_CASES.items():
+        got = tiktok.social_links_from_bio(bio)
+        if got != expected:
+            problems.append(f"bio {bio!r}: expected {expected}, got {got}")
+    return problems
+
+def check_fixtures(scraper, fixtures):
+    """Mismatches between each fixture's extraction and EXPECTED, as readable lines"""
+    problems = []
+    for name, html in fixtures.items():
+        if name not in EXPECTED:
+            continue
+        result = scraper._extract_data(html)
+        got = f"error: {result['error']}" if "error" in result else result.get('unique_id')
+        if not (got or '').startswith(EXPECTED[name]):
+            problems.append(f"{name}: expected {EXPECTED[name]!r}, got {got!r}")
+    return problems
+
+def time_calls(func, arg, iterations):
+    """Per-call wall times in seconds"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction on saved profile pages")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per extractor and fixture (default: 200)")
+    parser.add_argument("--fixture", action="append", help="Only run these fixtures (repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    
+    scraper = tiktok.TikTokScraper(use_colors=False)
+    fixtures = load_fixtures()
+    if args.fixture:
+        fixtures = {name: fixtures[name] for name in args.fixture}
+    
+    problems = check_fixtures(scraper, fixtures) + check_bios()
+    if problems:
+        sys.exit("Extraction check failed:\n  " + "\n  ".join(problems))
+    
+    results = []
+    for fixture, html in fixtures.items():
+        size_mb = len(html.encode('utf-8')) / (1024 * 1024)
+        for name, func in extractors(scraper).items():
+            func(html)  # warm up
+            samples = time_calls(func, html, args.iterations)
+            mean = sum(samples) / len(samples)
+            results.append({
+                'fixture': fixture,
+                'function': name,
+                'mean_us': mean * 1e6,
+                'p50_us': percentile(samples, 50) * 1e6,
+                'p99_us': percentile(samples, 99) * 1e6,
+                'mb_per_s': size_mb / mean if mean else 0.0,
+            })
+    
+    if args.json:
+        emit({'results': results, 'peak_rss_mb': peak_rss_mb()}, True)
+        return
+    
+    print(f"{'fixture':<10} {'function':<24} {'mean us':>10} {'p50 us':>10} {'p99 us':>10} {'MB/s':>9}")
+    for row in results:
+        print(f"{row['fixture']:<10} {row['function']:<24} {row['mean_us']:>10.1f} {row['p50_us']:>10.1f} "
+              f"{row['p99_us']:>10.1f} {row['mb_per_s']:>9.1f}")
+    print(f"\npeak RSS: {peak_rss_mb():.1f} MB" if peak_rss_mb() is not None else "")
+
+if __name__ == "__main__":
+    main()
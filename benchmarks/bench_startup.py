@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for one-shot command-line runs
+Reports median wall time of bare interpreter start, `import tiktok`, --help and a
+single --json lookup against the local stub server, plus which heavy modules load
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, percentile, emit
+from stub_server import StubTikTokServer
+
+SCRIPT = os.path.join(ROOT, 'tiktok.py')
+HEAVY_MODULES = ('requests', 'urllib3', 'bs4', 'lxml', 'asyncio', 'sqlite3', 'multiprocessing', 'concurrent.futures')
+
+# ============================================
+# BENCHMARK
+# ============================================
+def time_command(argv, runs):
+    """Median wall time in ms of running argv to completion"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False, cwd=ROOT)
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000
+
+def loaded_modules(code):
+    """Heavy modules present in sys.modules after running code in a fresh interpreter"""
+    probe = f"import sys\n{code}\nprint(__import__('json').dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, cwd=ROOT)
+    return json.loads(result.stdout.strip().splitlines()[-1]) if result.returncode == 0 else None
+
+def run(args, base_url, workdir):
+    """Time each startup path and return the report dict"""
+    # Lookups update the identity index; keep it out of the source tree
+    index = os.path.join(workdir, 'identities.db')
+    lookup = [sys.executable, SCRIPT, 'large', '--json', '--base-url', base_url, '--index', index]
+    database = os.path.join(workdir, 'profiles.db')
+    return {
+        'runs': args.runs,
+        'python_ms': time_command([sys.executable, '-c', 'pass'], args.runs),
+        'import_ms': time_command([sys.executable, '-c', 'import tiktok'], args.runs),
+        'help_ms': time_command([sys.executable, SCRIPT, '--help'], args.runs),
+        'json_lookup_ms': time_command(lookup, args.runs),
+        'loaded_by_import': ','.join(loaded_modules('import tiktok') or []) or '-',
+        'loaded_by_lookup': ','.join(loaded_modules(
+            "import tiktok, contextlib, io\n"
+            f"sys.argv = ['tiktok.py', 'large', '--json', '--base-url', {base_url!r}, '--index', {index!r}]\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            "    tiktok.command_line_mode()"
+        ) or []) or '-',
+        # Store queries only display records and must not pull in the HTTP stack
+        'loaded_by_latest': ','.join(loaded_modules(
+            "import tiktok, contextlib, io\n"
+            f"sys.argv = ['tiktok.py', '--latest', '--db', {database!r}]\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            "    tiktok.command_line_mode()"
+        ) or []) or '-',
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark interpreter + import + one-shot CLI startup time")
+    parser.add_argument("--runs", type=int, default=15, help="Runs per measurement (default: 15)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    server = StubTikTokServer(default_fixture='large').start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            report = run(args, server.base_url, workdir)
+    finally:
+        server.shutdown()
+    emit(report, args.json)
+
+if __name__ == "__main__":
+    main()
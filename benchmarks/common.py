@@ -0,0 +1,55 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import json
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+# Make tiktok.py importable when run as `python benchmarks/<script>.py`
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def load_fixtures():
+    """Return {name: html} for the saved profile pages"""
+    fixtures = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith('.html'):
+            with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+                fixtures[name[:-5]] = f.read()
+    return fixtures
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def emit(report, as_json):
+    """Print a report dict as JSON or aligned key/value lines"""
+    if as_json:
+        print(json.dumps(report, indent=2))
+        return
+    width = max(len(key) for key in report)
+    for key, value in report.items():
+        if isinstance(value, float):
+            value = f"{value:.3f}"
+        print(f"{key:<{width}}  {value}")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Generate the offline profile page corpus used by the benchmarks
+Pages mimic the layout of live TikTok profile pages; output is deterministic
+"""
+
+import json
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# ============================================
+# PAGE BUILDING
+# ============================================
+def filler_script(rng, size):
+    """Minified-looking JS blob of roughly size bytes"""
+    words = ['function', 'return', 'var', 'this', 'null', 'window', 'document', 'e', 't', 'n', 'r']
+    parts = []
+    total = 0
+    while total < size:
+        chunk = f"{rng.choice(words)}({rng.randrange(10**6)})&&{rng.choice(words)}.{rng.choice(words)}={rng.randrange(10**9)};"
+        parts.append(chunk)
+        total += len(chunk)
+    return ''.join(parts)
+
+def filler_css(rng, size):
+    """Inline CSS blob of roughly size bytes"""
+    parts = []
+    total = 0
+    while total < size:
+        chunk = f".css-{rng.randrange(16**6):06x}{{display:flex;margin:{rng.randrange(40)}px;color:#{rng.randrange(16**6):06x}}}"
+        parts.append(chunk)
+        total += len(chunk)
+    return ''.join(parts)
+
+def sec_uid(unique_id):
+    """Stable fake secUid for a handle"""
+    return "MS4wLjABAAAA" + unique_id.encode().hex() * 4
+
+def user_detail(unique_id, nickname, signature, followers, private=False, bio_link=None, items=0):
+    """webapp.user-detail payload as embedded in the page"""
+    user = {
+        "id": str(6812345678900000000 + int(unique_id.encode().hex()[:12], 16) % 10**9),
+        "shortId": "",
+        "uniqueId": unique_id,
+        "nickname": nickname,
+        "avatarLarger": f"https://p16-sign-va.tiktokcdn.com/tos-maliva-avt-0068/{unique_id}~c5_1080x1080.jpeg?x-expires=1700000000&x-signature=abc%3D",
+        "avatarMedium": f"https://p16-sign-va.tiktokcdn.com/tos-maliva-avt-0068/{unique_id}~c5_720x720.jpeg",
+        "avatarThumb": f"https://p16-sign-va.tiktokcdn.com/tos-maliva-avt-0068/{unique_id}~c5_100x100.jpeg",
+        "signature": signature,
+        "createTime": 1584000000,
+        "verified": followers > 1000000,
+        "secUid": sec_uid(unique_id),
+        "ftc": False,
+        "relation": 0,
+        "openFavorite": False,
+        "commentSetting": 0,
+        "duetSetting": 0,
+        "stitchSetting": 0,
+        "privateAccount": private,
+        "secret": private,
+        "isADVirtual": False,
+        "roomId": "",
+        "uniqueIdModifyTime": 0,
+        "ttSeller": False,
+        "region": "US",
+        "language": "en",
+    }
+    if bio_link:
+        user["bioLink"] = {"link": bio_link, "risk": 0}
+    stats = {
+        "followerCount": followers,
+        "followingCount": 321,
+        "heart": followers * 13,
+        "heartCount": followers * 13,
+        "videoCount": 412,
+        "diggCount": 9876,
+        "friendCount": 54,
+    }
+    item_list = [{"id": str(7300000000000000000 + i), "desc": f"video {i} #fyp"} for i in range(items)]
+    return {"statusCode": 0, "statusMsg": "", "userInfo": {"user": user, "stats": stats, "itemList": item_list}}
+
+def item_list(rng, unique_id, count):
+    """Full post list of an account as the item_list endpoint would return it, newest first"""
+    items = []
+    created = 1700000000
+    for i in range(count):
+        created -= rng.randrange(3600, 4 * 86400)
+        plays = rng.randrange(1000, 5 * 10**7)
+        items.append({
+            "id": str(7300000000000000000 + count - i),
+            "desc": f"post {count - i} {rng.choice(['#fyp', '#foryou', '#dance', '#comedy', ''])}".strip(),
+            "createTime": created,
+            "isPinnedItem": i < 2,
+            "author": {"uniqueId": unique_id, "nickname": unique_id.title()},
+            "video": {
+                "id": str(7300000000000000000 + count - i),
+                "duration": rng.randrange(5, 180),
+                "ratio": "720p",
+                "cover": f"https://p16-sign-va.tiktokcdn.com/obj/tos-maliva-p-0068/{rng.randrange(16**12):012x}",
+                "playAddr": f"https://v16-webapp.tiktok.com/{rng.randrange(16**16):016x}/video.mp4",
+            },
+            "music": {"id": str(rng.randrange(10**18)), "title": "original sound", "authorName": unique_id},
+            "stats": {
+                "playCount": plays,
+                "diggCount": plays // rng.randrange(5, 40),
+                "commentCount": plays // rng.randrange(200, 2000),
+                "shareCount": plays // rng.randrange(300, 3000),
+                "collectCount": plays // rng.randrange(100, 1000),
+            },
+        })
+    return {"secUid": sec_uid(unique_id), "itemList": items}
+
+def page(rng, detail, head_bytes, tail_bytes, state_override=None):
+    """Full HTML document around a rehydration script"""
+    state = state_override if state_override is not None else json.dumps({
+        "__DEFAULT_SCOPE__": {
+            "webapp.app-context": {"language": "en", "region": "US", "appId": 1988, "user": {}},
+            "webapp.biz-context": {"renderAbTest": {}, "abTestVersion": {"versionName": "70.1.0"}},
+            "webapp.user-detail": detail,
+            "seo.abtest": {"canonical": "https://www.tiktok.com/"},
+        }
+    }, separators=(',', ':'), ensure_ascii=False)
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f'<title>TikTok</title><style>{filler_css(rng, head_bytes // 2)}</style>'
+        f'<script>{filler_script(rng, head_bytes // 2)}</script></head><body>'
+        '<div id="app"><div class="css-1 e1"></div></div>'
+        f'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">{state}</script>'
+        f'<script>{filler_script(rng, tail_bytes)}</script></body></html>'
+    )
+
+# ============================================
+# CORPUS
+# ============================================
+def build_corpus():
+    """Return {name: html} for every fixture"""
+    rng = random.Random(315)
+    corpus = {}
+    
+    corpus['large'] = page(rng, user_detail(
+        'large', 'Large Creator ✨',
+        'Official account 🎵\nig: @large.official | yt: largechannel\nbiz: contact@large-creator.com\ntwitter @largetweets',
+        48200000, bio_link='https://linktr.ee/largecreator', items=30,
+    ), head_bytes=250000, tail_bytes=200000)
+    
+    corpus['minimal'] = (
+        '<html><body><script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+        + json.dumps({"__DEFAULT_SCOPE__": {"webapp.user-detail": user_detail('minimal', 'min', '', 12)}}, separators=(',', ':'))
+        + '</script></body></html>'
+    )
+    
+    corpus['private'] = page(rng, user_detail(
+        'private', 'Private Person', 'friends only', 842, private=True,
+    ), head_bytes=60000, tail_bytes=40000)
+    
+    # Truncated state JSON forces the regex fallback path
+    good = page(rng, user_detail('malformed', 'Broken Page', 'snap: brokenpage', 5300), head_bytes=40000, tail_bytes=20000)
+    start = good.index('__UNIVERSAL_DATA_FOR_REHYDRATION__')
+    end = good.index('</script>', start)
+    corpus['malformed'] = good[:good.index('"seo.abtest"', start)] + good[end:]
+    
+    # Unknown user: statusCode set and no userInfo
+    corpus['notfound'] = page(rng, {"statusCode": 10221, "statusMsg": "user not exist"}, head_bytes=40000, tail_bytes=20000)
+    
+    # Older SIGI_STATE layout
+    detail = user_detail('legacy', 'Legacy Layout', 'fb: legacy.page', 77000)["userInfo"]
+    sigi = json.dumps({"UserModule": {"users": {"legacy": detail["user"]}, "stats": {"legacy": detail["stats"]}}}, separators=(',', ':'))
+    corpus['legacy'] = page(rng, None, head_bytes=40000, tail_bytes=20000, state_override=sigi).replace(
+        '__UNIVERSAL_DATA_FOR_REHYDRATION__', 'SIGI_STATE')
+    
+    return corpus
+
+def build_item_lists():
+    """Return {name: full post list} for accounts whose videos can be paged"""
+    rng = random.Random(316)
+    return {
+        'large': item_list(rng, 'large', 412),
+        'legacy': item_list(rng, 'legacy', 37),
+        'minimal': item_list(rng, 'minimal', 0),
+    }
+
+def main():
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, html in build_corpus().items():
+        path = os.path.join(FIXTURES_DIR, f"{name}.html")
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(html)
+        print(f"{path}: {len(html.encode('utf-8')) / 1024:.1f} KB")
+    # Served a page at a time by the stub's item_list endpoint
+    for name, items in build_item_lists().items():
+        path = os.path.join(FIXTURES_DIR, f"{name}.items.json")
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            json.dump(items, f, separators=(',', ':'), ensure_ascii=False)
+        print(f"{path}: {len(items['itemList'])} videos")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an HTTP egress proxy in front of the stub server
+Forwards absolute-URI GETs (plain-HTTP targets only) with configurable latency, failures and blocks
+"""
+
+import argparse
+import http.client
+import http.server
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+# ============================================
+# STUB PROXY
+# ============================================
+class StubProxyServer(http.server.ThreadingHTTPServer):
+    """Threaded forward proxy; outcome per request is ok, error (502), blocked (429) or dropped"""
+    daemon_threads = True
+    
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0, error_rate=0.0, block_rate=0.0, drop_rate=0.0, seed=None):
+        super().__init__(address, StubProxyHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.block_rate = block_rate
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        self.upstream = threading.local()
+    
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+    
+    def roll(self):
+        """Outcome of one proxied request"""
+        with self.rng_lock:
+            self.requests += 1
+            draw = self.rng.random()
+        for outcome, rate in (('dropped', self.drop_rate), ('error', self.error_rate), ('blocked', self.block_rate)):
+            if draw < rate:
+                return outcome
+            draw -= rate
+        return 'ok'
+    
+    def connection(self, netloc):
+        """Keep-alive upstream connection for this handler thread"""
+        connections = self.upstream.__dict__.setdefault('connections', {})
+        if netloc not in connections:
+            connections[netloc] = http.client.HTTPConnection(netloc, timeout=15)
+        return connections[netloc]
+    
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+    
+    def start(self):
+        """Serve on a daemon thread; returns self for chaining"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+class StubProxyHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def send_body(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        outcome = self.server.roll()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if outcome == 'dropped':
+            self.close_connection = True
+            return
+        if outcome == 'error':
+            self.send_body(502)
+            return
+        if outcome == 'blocked':
+            self.send_body(429, headers=[('Retry-After', '1')])
+            return
+        
+        target = urllib.parse.urlsplit(self.path)
+        if target.scheme != 'http':
+            self.send_body(501)
+            return
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in ('proxy-connection', 'proxy-authorization')}
+        upstream = self.server.connection(target.netloc)
+        try:
+            upstream.request('GET', target.path + (f"?{target.query}" if target.query else ''), headers=headers)
+            response = upstream.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            upstream.close()
+            self.send_body(502)
+            return
+        passed = [(name, value) for name, value in response.getheaders()
+                  if name.lower() not in ('content-length', 'transfer-encoding', 'connection')]
+        self.send_body(response.status, body, passed)
+
+# ============================================
+# COMMAND LINE
+# ============================================
+def main():
+    parser = argparse.ArgumentParser(description="Run stand-in egress proxies for the stub server")
+    parser.add_argument("--port", type=int, default=8780, help="Port of the first proxy (default: 8780)")
+    parser.add_argument("--count", type=int, default=1, help="Proxies to start on consecutive ports (default: 1)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added by each proxy (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction answered 502 by the proxy")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="Fraction answered 429, as if the site blocked this egress address")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of connections closed without a response")
+    args = parser.parse_args()
+    
+    proxies = [
+        StubProxyServer(('127.0.0.1', args.port + i), args.latency, args.error_rate, args.block_rate, args.drop_rate).start()
+        for i in range(args.count)
+    ]
+    for proxy in proxies:
+        print(f"Proxying at {proxy.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for www.tiktok.com that serves the fixture corpus
+/@<name> serves fixtures/<name>.html when it exists, else the default fixture
+/api/post/item_list/?secUid=...&cursor=...&count=... pages through fixtures/<name>.items.json
+"""
+
+import argparse
+import http.server
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+CAPTCHA_PAGE = (b'<html><head><title>Security Check</title></head><body>'
+                b'<div id="captcha_container" class="captcha-verify-container"><div class="verify-bar-close"></div></div>'
+                b'</body></html>')
+# item_list answers at most this many posts per page
+MAX_PAGE_SIZE = 35
+
+# ============================================
+# STUB SERVER
+# ============================================
+class StubTikTokServer(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server with configurable latency and error rate"""
+    daemon_threads = True
+    
+    def __init__(self, address=('127.0.0.1', 0), default_fixture='large', latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, seed=None, rate_limit=0.0, retry_after=1, captcha_rate=0.0):
+        super().__init__(address, StubHandler)
+        self.default_fixture = default_fixture
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.captcha_rate = captcha_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        self.limited = 0
+        # Token bucket holding one second of burst
+        self.tokens = rate_limit
+        self.refilled = time.monotonic()
+        self.fixtures = {}
+        # secUid -> full post list, served a page at a time
+        self.item_lists = {}
+        for name in os.listdir(FIXTURES_DIR):
+            if name.endswith('.items.json'):
+                with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+                    items = json.load(f)
+                self.item_lists[items['secUid']] = items['itemList']
+            elif name.endswith('.html'):
+                with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+                    self.fixtures[name[:-5]] = f.read()
+    
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+    
+    def roll(self):
+        """Return (delay, outcome) for one request; outcome is ok, error, limited or captcha"""
+        with self.rng_lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            if self.rate_limit:
+                now = time.monotonic()
+                self.tokens = min(self.rate_limit, self.tokens + (now - self.refilled) * self.rate_limit)
+                self.refilled = now
+                if self.tokens < 1:
+                    self.limited += 1
+                    return delay, 'limited'
+                self.tokens -= 1
+            if self.rng.random() < self.error_rate:
+                return delay, 'error'
+            if self.rng.random() < self.captcha_rate:
+                return delay, 'captcha'
+            return delay, 'ok'
+    
+    def handle_error(self, request, client_address):
+        """Clients that stop reading early (streaming fetch) are expected"""
+        if not isinstance(sys.exc_info()[1], (ConnectionError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+    
+    def start(self):
+        """Serve on a daemon thread; returns self for chaining"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def send_body(self, status, body, content_type='text/html; charset=utf-8', headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        delay, outcome = self.server.roll()
+        if delay:
+            time.sleep(delay)
+        if outcome == 'limited':
+            self.send_body(429, b'', headers=[('Retry-After', str(self.server.retry_after))])
+            return
+        if outcome == 'error':
+            self.send_body(self.server.error_status, b'')
+            return
+        if outcome == 'captcha':
+            self.send_body(200, CAPTCHA_PAGE)
+            return
+        
+        path, _, query = self.path.partition('?')
+        if path.rstrip('/') == '/api/post/item_list':
+            self.send_item_page(urllib.parse.parse_qs(query))
+            return
+        if not path.startswith('/@'):
+            self.send_body(404, b'')
+            return
+        
+        name = path[2:]
+        body = self.server.fixtures.get(name, self.server.fixtures[self.server.default_fixture])
+        self.send_body(200, body)
+    
+    def send_item_page(self, params):
+        """One page of an account's posts; the cursor is an opaque offset into the list"""
+        items = self.server.item_lists.get(params.get('secUid', [''])[0])
+        if items is None:
+            payload = {"statusCode": 10201, "statusMsg": "invalid secUid"}
+        else:
+            try:
+                offset = max(0, int(params.get('cursor', ['0'])[0]))
+                count = min(MAX_PAGE_SIZE, max(1, int(params.get('count', ['30'])[0])))
+            except ValueError:
+                self.send_body(400, b'')
+                return
+            page = items[offset:offset + count]
+            payload = {"statusCode": 0, "itemList": page, "cursor": str(offset + len(page)),
+                       "hasMore": offset + len(page) < len(items)}
+        self.send_body(200, json.dumps(payload, separators=(',', ':')).encode('utf-8'), 'application/json')
+
+# ============================================
+# COMMAND LINE
+# ============================================
+def main():
+    parser = argparse.ArgumentParser(description="Serve the benchmark fixtures as a fake TikTok")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixture", default="large", help="Fixture served for unknown names (default: large)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- seconds around --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Answer 429 above this many requests per second (default: off)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s (default: 1)")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Fraction of requests answered with a captcha page")
+    args = parser.parse_args()
+    
+    server = StubTikTokServer(('127.0.0.1', args.port), args.fixture, args.latency, args.jitter,
+                              args.error_rate, args.error_status, rate_limit=args.rate_limit,
+                              retry_after=args.retry_after, captcha_rate=args.captcha_rate)
+    print(f"Serving {len(server.fixtures)} fixtures and {len(server.item_lists)} video lists at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
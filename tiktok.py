@@ -4,16 +4,45 @@ Enhanced TikTok User Info Scraper
 With colorful terminal menu and improved features
 """
 
-import requests
 import re
 import argparse
+import importlib
 import urllib.parse
 import json
 import sys
 import os
-from bs4 import BeautifulSoup
 from datetime import datetime
 import time
+import codecs
+import bisect
+import heapq
+from dataclasses import dataclass
+from contextlib import contextmanager
+from collections import deque, OrderedDict
+import math
+import random
+import threading
+import atexit
+import zlib
+import hashlib
+import shutil
+import tempfile
+
+class _LazyModule:
+    """Module stand-in that imports the real module on first attribute access"""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# Heavy or path-specific dependencies; a single lookup never loads the batch machinery
+requests = _LazyModule('requests')
+asyncio = _LazyModule('asyncio')
+sqlite3 = _LazyModule('sqlite3')
 
 # ============================================
 # COLOR MANAGEMENT
@@ -131,12 +160,1375 @@ def progress_bar(iteration, total, prefix='', suffix='', length=50, fill='█'):
     if iteration == total:
         print()
 
+class BatchDashboard:
+    """Compact live batch status, redrawn in place with one buffered write per frame"""
+    def __init__(self, total=None, use_colors=True, fps=4, max_errors=3, stream=None):
+        self.total = total
+        self.use_colors = use_colors
+        self.stream = stream or sys.stdout
+        self.interactive = self.stream.isatty()
+        # Logs and pipes get an occasional plain line instead of redraws
+        self.interval = 1 / fps if self.interactive else 5.0
+        self.completed = 0
+        self.failed = 0
+        self.errors = deque(maxlen=max_errors)
+        self.recent = deque(maxlen=100)
+        self.started = time.monotonic()
+        self._last_frame = 0.0
+        self._frame_lines = 0
+    
+    def colorize(self, text, color):
+        return f"{color}{text}{C.RESET}" if self.use_colors else text
+    
+    def update(self, identifier, user_data):
+        """Count one result and redraw if a frame is due"""
+        now = time.monotonic()
+        self.completed += 1
+        self.recent.append(now)
+        if "error" in user_data:
+            self.failed += 1
+            self.errors.append(f"{identifier}: {user_data['error']}")
+        if now - self._last_frame >= self.interval:
+            self.render(now)
+    
+    def track(self, identifiers):
+        """Pass the input through; once it runs out, the estimated total becomes the exact count"""
+        count = 0
+        for identifier in identifiers:
+            count += 1
+            yield identifier
+        self.total = count
+    
+    def rate(self, now):
+        """Completions per second over the last 100 results"""
+        if len(self.recent) < 2:
+            return self.completed / max(now - self.started, 1e-6)
+        return (len(self.recent) - 1) / max(now - self.recent[0], 1e-6)
+    
+    def frame(self, now):
+        """Dashboard lines for the current state"""
+        rate = self.rate(now)
+        elapsed = self._clock(now - self.started)
+        ok = self.completed - self.failed
+        if self.total:
+            filled = int(30 * min(self.completed, self.total) // self.total)
+            bar = '█' * filled + '─' * (30 - filled)
+            eta = self._clock((self.total - self.completed) / rate) if rate and self.completed < self.total else '--:--'
+            head = f"|{self.colorize(bar, C.BRIGHT_CYAN)}| {100 * self.completed / self.total:5.1f}%  {self.completed}/{self.total}"
+        else:
+            eta = '--:--'
+            head = f"{self.completed} processed"
+        lines = [
+            head,
+            f"{self.colorize(f'✅ {ok} ok', C.GREEN)}  {self.colorize(f'❌ {self.failed} failed', C.RED)}  "
+            f"⚡ {rate:.1f}/s  ⏳ ETA {eta}  elapsed {elapsed}",
+        ]
+        # Keep every line on one terminal row so the cursor-up redraw stays aligned
+        width = max(20, shutil.get_terminal_size().columns - 4)
+        lines += [self.colorize(f"   {error[:width - 3]}", C.DIM) for error in self.errors]
+        return lines
+    
+    def render(self, now=None, final=False):
+        """Write one frame, replacing the previous one on a terminal"""
+        now = now or time.monotonic()
+        lines = self.frame(now)
+        if self.interactive:
+            # Cursor up to the previous frame, clear it, draw the new one
+            prefix = f"\033[{self._frame_lines}F\033[J" if self._frame_lines else ''
+            self.stream.write(prefix + '\n'.join(lines) + '\n')
+            self._frame_lines = len(lines)
+        elif final or self.completed:
+            self.stream.write(lines[0] + '  ' + lines[1] + '\n')
+        self.stream.flush()
+        self._last_frame = now
+    
+    def close(self):
+        """Draw the final state"""
+        self.render(final=True)
+    
+    @staticmethod
+    def _clock(seconds):
+        seconds = int(seconds)
+        if seconds >= 3600:
+            return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+        return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+# ============================================
+# PAGE PARSING
+# ============================================
+# Embedded page state scripts, newest layout first
+REHYDRATION_SCRIPT_IDS = ('__UNIVERSAL_DATA_FOR_REHYDRATION__', 'SIGI_STATE')
+
+# Byte markers used by the streaming fetch to spot the state script
+REHYDRATION_MARKERS = tuple(f'id="{script_id}"'.encode() for script_id in REHYDRATION_SCRIPT_IDS)
+MAX_MARKER_LEN = max(len(marker) for marker in REHYDRATION_MARKERS)
+SCRIPT_END = b'</script>'
+STREAM_CHUNK_SIZE = 64 * 1024
+# Finish reading bodies with at most this much left so the connection can be reused
+STREAM_DRAIN_LIMIT = 64 * 1024
+
+# Posts per item_list page; the endpoint answers at most 35
+VIDEO_PAGE_SIZE = 30
+# item_list is fetched like the site's own XHR, not as a page navigation
+VIDEO_PAGE_HEADERS = {
+    'Accept': 'application/json, text/plain, */*',
+    'Sec-Fetch-Dest': 'empty',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Site': 'same-origin',
+}
+
+# Responses that mean "slow down" rather than "no such user"
+THROTTLE_STATUSES = {429: 'rate limited', 403: 'soft block'}
+# Markers of captcha / verification interstitials served with status 200
+CHALLENGE_MARKERS = (b'captcha', b'verify-bar', b'secsdk')
+
+# Output field -> (object, key) inside the user-detail payload
+USER_DETAIL_FIELDS = {
+    'user_id': ('user', 'id'),
+    'unique_id': ('user', 'uniqueId'),
+    'nickname': ('user', 'nickname'),
+    'followers': ('stats', 'followerCount'),
+    'following': ('stats', 'followingCount'),
+    'likes': ('stats', 'heartCount'),
+    'videos': ('stats', 'videoCount'),
+    'signature': ('user', 'signature'),
+    'verified': ('user', 'verified'),
+    'secUid': ('user', 'secUid'),
+    'privateAccount': ('user', 'privateAccount'),
+    'region': ('user', 'region'),
+    'diggCount': ('stats', 'diggCount'),
+    'friendCount': ('stats', 'friendCount'),
+    'avatarLarger': ('user', 'avatarLarger'),
+    'createTime': ('user', 'createTime'),
+}
+
+# Regex fallback for pages without a parseable rehydration script
+PROFILE_PATTERNS = {
+    'user_id': re.compile(r'"webapp\.user-detail"[^}]*"id":"(\d+)"'),
+    'unique_id': re.compile(r'"uniqueId":"([^"]+)"'),
+    'nickname': re.compile(r'"nickname":"([^"]+)"'),
+    'followers': re.compile(r'"followerCount":(\d+)'),
+    'following': re.compile(r'"followingCount":(\d+)'),
+    'likes': re.compile(r'"heartCount":(\d+)'),
+    'videos': re.compile(r'"videoCount":(\d+)'),
+    'signature': re.compile(r'"signature":"([^"]*?)"'),
+    'verified': re.compile(r'"verified":(true|false)'),
+    'secUid': re.compile(r'"secUid":"([^"]+)"'),
+    'privateAccount': re.compile(r'"privateAccount":(true|false)'),
+    'region': re.compile(r'"region":"([^"]*)"'),
+    'diggCount': re.compile(r'"diggCount":(\d+)'),
+    'friendCount': re.compile(r'"friendCount":(\d+)'),
+    'avatarLarger': re.compile(r'"avatarLarger":"([^"]+)"'),
+    'createTime': re.compile(r'"createTime":(\d+)'),
+}
+
+PROFILE_ALT_PATTERNS = {
+    'user_id': re.compile(r'"userId":"(\d+)"'),
+    'unique_id': re.compile(r'"uniqueId":"([^"]+)"'),
+    'nickname': re.compile(r'"nickName":"([^"]+)"'),
+}
+
+def find_rehydration_json(html_content):
+    """Locate the embedded page-state JSON and return (start, end) offsets"""
+    for script_id in REHYDRATION_SCRIPT_IDS:
+        marker = html_content.find(f'id="{script_id}"')
+        if marker == -1:
+            continue
+        start = html_content.find('>', marker)
+        end = html_content.find('</script>', start)
+        if start != -1 and end != -1:
+            return start + 1, end
+    return None
+
+def missing_user_error(state):
+    """Error result for a page state that parsed but carries no user, with TikTok's own status when given"""
+    scope = state.get('__DEFAULT_SCOPE__')
+    detail = scope.get('webapp.user-detail') if isinstance(scope, dict) else None
+    if isinstance(detail, dict) and detail.get('statusCode'):
+        reason = f"statusCode {detail['statusCode']}"
+        if detail.get('statusMsg'):
+            reason += f": {detail['statusMsg']}"
+        return {"error": f"User not found ({reason})"}
+    return {"error": "User not found (no user data in page state)"}
+
+def user_detail_from_state(state):
+    """Pull the {'user': ..., 'stats': ...} pair out of a page-state document"""
+    # Current layout: __UNIVERSAL_DATA_FOR_REHYDRATION__
+    scope = state.get('__DEFAULT_SCOPE__')
+    if isinstance(scope, dict):
+        user_info = (scope.get('webapp.user-detail') or {}).get('userInfo') or {}
+        if user_info.get('user'):
+            return user_info
+        return None
+    
+    # Legacy layout: SIGI_STATE keyed by uniqueId
+    module = state.get('UserModule')
+    if isinstance(module, dict) and module.get('users'):
+        unique_id, user = next(iter(module['users'].items()))
+        return {'user': user, 'stats': (module.get('stats') or {}).get(unique_id, {})}
+    return None
+
+def parse_retry_after(value):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# ============================================
+# SOCIAL LINKS
+# ============================================
+MAX_SOCIAL_LINKS = 10
+
+# Bio handles in output order; email is reported last
+BIO_PLATFORMS = ('instagram', 'twitter', 'youtube', 'snapchat', 'facebook', 'telegram', 'email')
+
+# One pass over the bio for every platform; email comes first so addresses are not read as handles.
+# Keywords are the original ones (ig, twitter, yt, snapchat, fb, telegram), now whole words only
+BIO_LINK_PATTERN = re.compile(r"""
+    (?P<email>[\w.+-]+@[\w-]+(?:\.[\w-]+)+)
+  | (?:\binstagram\.com/|\big\b[\s:]*@?)(?P<instagram>[\w.]+)
+  | (?:\b(?:twitter|x)\.com/|\btwitter\b[\s:]*@?)(?P<twitter>[\w.]+)
+  | (?:\byoutube\.com/(?:@|c/|channel/|user/)?|\byt\b[\s:]*@?)(?P<youtube>[\w.-]+)
+  | (?:\bsnapchat\.com/add/|\bsnapchat\b[\s:]*@?)(?P<snapchat>[\w.-]+)
+  | (?:\bfacebook\.com/|\bfb\b[\s:]*@?)(?P<facebook>[\w.]+)
+  | (?:\bt\.me/|\btelegram\b[\s:]*@?)(?P<telegram>\w+)
+""", re.IGNORECASE | re.VERBOSE)
+
+# Outbound links embedded in the page-state JSON, in document order
+PAGE_LINK_PATTERN = re.compile(r'"bioLink":\{"link":"([^"]+)"|"shareUrl":"([^"]+)"|scene=bio_url[^"]*?target=([^"&\\]+)')
+
+def social_links_from_bio(bio):
+    """Platform handles and the first email address in a bio, in BIO_PLATFORMS order"""
+    found = {}
+    for match in BIO_LINK_PATTERN.finditer(bio or ''):
+        platform = match.lastgroup
+        if platform not in found:
+            handle = match.group(platform).rstrip('.')
+            if handle:
+                found[platform] = handle
+                if len(found) == len(BIO_PLATFORMS):
+                    break
+    return [f"{platform}:{found[platform]}" for platform in BIO_PLATFORMS if platform in found]
+
+def page_links(html_content, bounds=None):
+    """Outbound http(s) links from the page-state JSON, deduplicated in document order"""
+    if bounds is None:
+        bounds = find_rehydration_json(html_content) or (0, len(html_content))
+    links = {}
+    for match in PAGE_LINK_PATTERN.finditer(html_content, *bounds):
+        raw = match.group(match.lastindex)
+        if '\\' in raw:
+            try:
+                raw = json.loads(f'"{raw}"')
+            except ValueError:
+                continue
+        decoded = urllib.parse.unquote(raw)
+        if decoded.startswith(('http://', 'https://', 'www.')):
+            links[decoded] = None
+    return list(links)
+
+def merge_social_links(links, bio):
+    """Page links then bio handles, deduplicated and capped at MAX_SOCIAL_LINKS"""
+    return tuple(dict.fromkeys(links + social_links_from_bio(bio)))[:MAX_SOCIAL_LINKS]
+
+def is_bio_link(link):
+    """True for entries derived from the bio rather than the page"""
+    return link.split(':', 1)[0] in BIO_PLATFORMS
+
+# ============================================
+# RESPONSE CACHE
+# ============================================
+DEFAULT_CACHE_PATH = '.tiktok_cache.db'
+
+class ResponseCache:
+    """On-disk profile page cache keyed by URL, with TTL and LRU eviction"""
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=3600, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        self._db.commit()
+        self._total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+    
+    def get(self, url):
+        """Return the cached entry for url (or None) and mark it recently used"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT body, etag, last_modified, stored_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (time.time(), url))
+            self._db.commit()
+        
+        body, etag, last_modified, stored_at = row
+        return {
+            'body': zlib.decompress(body),
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': stored_at,
+        }
+    
+    def is_fresh(self, entry):
+        """True while an entry is younger than the TTL"""
+        return time.time() - entry['stored_at'] < self.ttl
+    
+    def validators(self, entry):
+        """Conditional request headers for revalidating an entry"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def put(self, url, page, etag=None, last_modified=None):
+        """Store a UTF-8 page body, evicting least recently used entries past max_bytes"""
+        body = zlib.compress(page, 1)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, body, etag, last_modified, now, now, len(body)),
+            )
+            self._total += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._db.commit()
+    
+    def touch(self, url):
+        """Restart the TTL of an entry the server confirmed is unchanged"""
+        with self._lock:
+            now = time.time()
+            self._db.execute('UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+            self._db.commit()
+    
+    def _evict(self):
+        """Drop least recently used entries until the cache fits (lock held)"""
+        while self._total > self.max_bytes:
+            rows = self._db.execute(
+                'SELECT url, size FROM responses ORDER BY accessed_at LIMIT 64'
+            ).fetchall()
+            if not rows:
+                self._total = 0
+                break
+            for url, size in rows:
+                if self._total <= self.max_bytes:
+                    break
+                self._db.execute('DELETE FROM responses WHERE url = ?', (url,))
+                self._total -= size
+    
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._db.close()
+
+# ============================================
+# AVATAR STORE
+# ============================================
+AVATAR_CHUNK_SIZE = 256 * 1024
+
+class AvatarStore:
+    """Content-addressed avatar files linked by username, with a URL manifest"""
+    def __init__(self, directory="profile_pics"):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, '.objects')
+        self.manifest_path = os.path.join(directory, '.manifest.json')
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+    
+    @staticmethod
+    def stable_url(url):
+        """Avatar URL without its signed, expiring query string"""
+        return urllib.parse.urlsplit(url)._replace(query='', fragment='').geturl()
+    
+    def link_path(self, unique_id):
+        """Per-user file name, same as the single-download layout"""
+        return os.path.join(self.directory, f"{unique_id}_profile.jpg")
+    
+    def is_current(self, unique_id, url):
+        """True if this user's avatar was already stored from the same URL"""
+        entry = self.manifest.get(unique_id)
+        return bool(entry) and entry['url'] == self.stable_url(url) and os.path.exists(self.link_path(unique_id))
+    
+    def store(self, unique_id, url, chunks):
+        """Write chunks under their SHA-256, link them to the user and return the link path"""
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+            # mkstemp creates 0600 files; match a regular open()
+            os.chmod(tmp_path, 0o644)
+            
+            content_hash = digest.hexdigest()
+            object_path = os.path.join(self.objects_dir, content_hash[:2], f"{content_hash}.jpg")
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            if os.path.exists(object_path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, object_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        link = self.link_path(unique_id)
+        self._link(object_path, link)
+        with self._lock:
+            self.manifest[unique_id] = {'url': self.stable_url(url), 'sha256': content_hash}
+        return link
+    
+    def _link(self, object_path, link):
+        """Point link at object_path, hard-linking where the filesystem allows"""
+        if os.path.exists(link) and os.path.samefile(object_path, link):
+            return
+        tmp_link = f"{link}.tmp"
+        if os.path.exists(tmp_link):
+            os.remove(tmp_link)
+        try:
+            os.link(object_path, tmp_link)
+        except OSError:
+            shutil.copyfile(object_path, tmp_link)
+        os.replace(tmp_link, link)
+    
+    def save(self):
+        """Persist the manifest atomically"""
+        with self._lock:
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, separators=(',', ':'))
+            os.replace(tmp_path, self.manifest_path)
+
+# ============================================
+# PROFILE RECORD
+# ============================================
+def _to_int(value):
+    """Parse a counter or timestamp, None when absent or unparseable"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+# Suffixes and date layout written by the old string-formatted exports
+COUNT_SUFFIXES = {'K': 10**3, 'M': 10**6, 'B': 10**9}
+EXPORT_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _parse_count(value):
+    """Counter from a raw value or an old export's "1.2M"; suffixed counts are only as precise as written"""
+    if isinstance(value, str) and value[-1:].upper() in COUNT_SUFFIXES:
+        try:
+            return round(float(value[:-1]) * COUNT_SUFFIXES[value[-1].upper()])
+        except ValueError:
+            return None
+    return _to_int(value)
+
+def _parse_timestamp(value):
+    """Unix time from a raw value or an old export's local-time date string"""
+    if isinstance(value, str) and '-' in value:
+        try:
+            return int(datetime.strptime(value, EXPORT_TIME_FORMAT).timestamp())
+        except ValueError:
+            return None
+    return _to_int(value)
+
+def _to_bool(value):
+    """Parse a JSON or regex-captured boolean"""
+    if isinstance(value, str):
+        return value.lower() == 'true'
+    return bool(value)
+
+def _to_str(value):
+    """Normalise missing text fields to None"""
+    if value is None or value == 'N/A':
+        return None
+    return str(value)
+
+@dataclass(slots=True)
+class ProfileRecord:
+    """Compact typed profile; counters stay raw ints until display"""
+    user_id: str = None
+    unique_id: str = None
+    nickname: str = None
+    followers: int = None
+    following: int = None
+    likes: int = None
+    videos: int = None
+    signature: str = None
+    verified: bool = False
+    secUid: str = None
+    privateAccount: bool = False
+    region: str = None
+    diggCount: int = None
+    friendCount: int = None
+    avatarLarger: str = None
+    createTime: int = None
+    social_links: tuple = ()
+    # Fetch metadata
+    fetch_time: float = None
+    timestamp: str = None
+    url: str = None
+    source: str = None
+    # Per-request timings and counters; not exported
+    metrics: dict = None
+    
+    INT_FIELDS = ('followers', 'following', 'likes', 'videos', 'diggCount', 'friendCount', 'createTime')
+    BOOL_FIELDS = ('verified', 'privateAccount')
+    TRANSIENT_FIELDS = ('metrics',)
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from extracted or previously exported values"""
+        values = {}
+        for name in cls.__dataclass_fields__:
+            if name not in data:
+                continue
+            value = data[name]
+            if name == 'createTime':
+                values[name] = _parse_timestamp(value)
+            elif name in cls.INT_FIELDS:
+                values[name] = _parse_count(value)
+            elif name in cls.BOOL_FIELDS:
+                values[name] = _to_bool(value)
+            elif name == 'social_links':
+                values[name] = tuple(value or ())
+            elif name == 'fetch_time':
+                values[name] = float(str(value).rstrip('s')) if value is not None else None
+            elif name in cls.TRANSIENT_FIELDS:
+                values[name] = value
+            else:
+                values[name] = _to_str(value)
+        return cls(**values)
+    
+    def to_dict(self):
+        """Lossless JSON-ready dict"""
+        data = {name: getattr(self, name) for name in self.__dataclass_fields__ if name not in self.TRANSIENT_FIELDS}
+        data['social_links'] = list(self.social_links)
+        return data
+    
+    # Read-only mapping access so records and error dicts share call sites
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__dataclass_fields__ else None
+        return default if value is None else value
+    
+    def __contains__(self, key):
+        return key in self.__dataclass_fields__ and getattr(self, key) is not None
+    
+    def __getitem__(self, key):
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+@dataclass(slots=True)
+class VideoRecord:
+    """Compact typed post from an account's video list"""
+    id: str = None
+    desc: str = None
+    createTime: int = None
+    duration: int = None
+    playCount: int = None
+    diggCount: int = None
+    commentCount: int = None
+    shareCount: int = None
+    collectCount: int = None
+    pinned: bool = False
+    url: str = None
+    
+    @classmethod
+    def from_item(cls, item, base_url="https://www.tiktok.com", unique_id=None):
+        """Keep the few fields worth storing from one item_list entry"""
+        # Nested objects that are missing or of the wrong type read as empty
+        stats, author, video = (value if isinstance(value, dict) else {} for value in
+                                (item.get('stats'), item.get('author'), item.get('video')))
+        author = author.get('uniqueId') or unique_id
+        video_id = _to_str(item.get('id'))
+        return cls(
+            id=video_id,
+            desc=_to_str(item.get('desc')),
+            createTime=_to_int(item.get('createTime')),
+            duration=_to_int(video.get('duration')),
+            playCount=_to_int(stats.get('playCount')),
+            diggCount=_to_int(stats.get('diggCount')),
+            commentCount=_to_int(stats.get('commentCount')),
+            shareCount=_to_int(stats.get('shareCount')),
+            collectCount=_to_int(stats.get('collectCount')),
+            pinned=_to_bool(item.get('isPinnedItem')),
+            url=f"{base_url}/@{author}/video/{video_id}" if author and video_id else None,
+        )
+    
+    def to_dict(self):
+        """JSON-ready dict"""
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
+    
+    # Same mapping access as ProfileRecord, so '"error" in video' works on the stream
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__dataclass_fields__ else None
+        return default if value is None else value
+    
+    def __contains__(self, key):
+        return key in self.__dataclass_fields__ and getattr(self, key) is not None
+
+def to_jsonable(user_data):
+    """Plain dict for a profile or video record, or an error result"""
+    if isinstance(user_data, (ProfileRecord, VideoRecord)):
+        return user_data.to_dict()
+    return {key: value for key, value in user_data.items() if key not in ProfileRecord.TRANSIENT_FIELDS}
+
+# ============================================
+# PROFILE STORE
+# ============================================
+DEFAULT_DB_PATH = 'profiles.db'
+
+class ProfileStore:
+    """SQLite history of profile snapshots with batched inserts"""
+    COLUMNS = (
+        'user_id', 'unique_id', 'scraped_at', 'nickname', 'followers', 'following', 'likes',
+        'videos', 'diggCount', 'friendCount', 'verified', 'privateAccount', 'region', 'secUid', 'record',
+    )
+    SERIES_FIELDS = ('followers', 'following', 'likes', 'videos', 'diggCount', 'friendCount')
+    
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=500, journal_mode='WAL', timeout=5.0):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._db.execute(f'PRAGMA journal_mode={journal_mode}')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                user_id TEXT,
+                unique_id TEXT,
+                scraped_at REAL NOT NULL,
+                nickname TEXT,
+                followers INTEGER,
+                following INTEGER,
+                likes INTEGER,
+                videos INTEGER,
+                diggCount INTEGER,
+                friendCount INTEGER,
+                verified INTEGER,
+                privateAccount INTEGER,
+                region TEXT,
+                secUid TEXT,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_user_id ON snapshots (user_id, scraped_at);
+            CREATE INDEX IF NOT EXISTS snapshots_unique_id ON snapshots (unique_id, scraped_at);
+            CREATE INDEX IF NOT EXISTS snapshots_scraped_at ON snapshots (scraped_at);
+        """)
+        self._db.commit()
+    
+    def _row(self, record):
+        """Flatten a record into a snapshots row"""
+        scraped_at = datetime.fromisoformat(record.timestamp).timestamp() if record.timestamp else time.time()
+        return (
+            record.user_id, record.unique_id, scraped_at, record.nickname, record.followers,
+            record.following, record.likes, record.videos, record.diggCount, record.friendCount,
+            record.verified, record.privateAccount, record.region, record.secUid,
+            json.dumps(record.to_dict(), ensure_ascii=False, separators=(',', ':')),
+        )
+    
+    def add(self, record):
+        """Queue a snapshot; rows are written in transactions of batch_size"""
+        # Pages without an account are errors upstream; such a row would corrupt latest()'s grouping
+        assert record.user_id or record.unique_id, "snapshot without an account identity"
+        with self._lock:
+            self._pending.append(self._row(record))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+    
+    def add_many(self, records):
+        """Queue many snapshots"""
+        for record in records:
+            self.add(record)
+    
+    def flush(self):
+        """Write any queued snapshots"""
+        with self._lock:
+            self._flush()
+    
+    def _flush(self):
+        if not self._pending:
+            return
+        placeholders = ', '.join('?' * len(self.COLUMNS))
+        with self._db:
+            self._db.executemany(
+                f"INSERT INTO snapshots ({', '.join(self.COLUMNS)}) VALUES ({placeholders})", self._pending
+            )
+        self._pending.clear()
+    
+    @staticmethod
+    def _account_key(account):
+        """Accept @handle, handle or numeric user ID"""
+        account = account.strip()
+        return account[1:] if account.startswith('@') else account
+    
+    def latest(self, account=None):
+        """Latest snapshot per account (or for one account) as ProfileRecords"""
+        self.flush()
+        if account:
+            key = self._account_key(account)
+            rows = self._db.execute(
+                'SELECT record FROM snapshots WHERE user_id = ? OR unique_id = ? ORDER BY scraped_at DESC LIMIT 1',
+                (key, key),
+            ).fetchall()
+        else:
+            rows = self._db.execute("""
+                SELECT record FROM (
+                    SELECT record, ROW_NUMBER() OVER (
+                        PARTITION BY COALESCE(user_id, unique_id) ORDER BY scraped_at DESC
+                    ) AS rank
+                    FROM snapshots
+                ) WHERE rank = 1
+            """).fetchall()
+        return [ProfileRecord.from_dict(json.loads(record)) for (record,) in rows]
+    
+    def history(self, account, since=None):
+        """Counter time series for one account, oldest first"""
+        self.flush()
+        key = self._account_key(account)
+        query = f"SELECT scraped_at, unique_id, {', '.join(self.SERIES_FIELDS)} FROM snapshots WHERE (user_id = ? OR unique_id = ?)"
+        params = [key, key]
+        if since is not None:
+            query += ' AND scraped_at >= ?'
+            params.append(since)
+        query += ' ORDER BY scraped_at'
+        
+        series = []
+        for row in self._db.execute(query, params):
+            point = dict(zip(('scraped_at', 'unique_id') + self.SERIES_FIELDS, row))
+            point['timestamp'] = datetime.fromtimestamp(point.pop('scraped_at')).isoformat()
+            series.append(point)
+        return series
+    
+    def relink(self, batch_size=5000):
+        """Recompute bio-derived social links of every snapshot; returns (scanned, updated)"""
+        self.flush()
+        scanned = updated = 0
+        last_id = 0
+        by_bio = {}
+        while True:
+            rows = self._db.execute(
+                "SELECT id, record FROM snapshots WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            
+            changes = []
+            for row_id, raw in rows:
+                record = json.loads(raw)
+                links = record.get('social_links') or []
+                bio = record.get('signature') or ''
+                # Snapshots of one account usually repeat the same bio
+                if bio not in by_bio:
+                    by_bio[bio] = social_links_from_bio(bio)
+                relinked = list(dict.fromkeys([link for link in links if not is_bio_link(link)] + by_bio[bio]))[:MAX_SOCIAL_LINKS]
+                if relinked != links:
+                    record['social_links'] = relinked
+                    changes.append((json.dumps(record, ensure_ascii=False, separators=(',', ':')), row_id))
+            
+            if changes:
+                with self._lock, self._db:
+                    self._db.executemany("UPDATE snapshots SET record = ? WHERE id = ?", changes)
+            scanned += len(rows)
+            updated += len(changes)
+            last_id = rows[-1][0]
+            if len(by_bio) > 100000:
+                by_bio.clear()
+        return scanned, updated
+    
+    def close(self):
+        """Flush pending snapshots and close the database"""
+        self.flush()
+        with self._lock:
+            self._db.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+# ============================================
+# IDENTITY INDEX
+# ============================================
+DEFAULT_INDEX_PATH = 'identities.db'
+
+class IdentityIndex:
+    """Local map of user_id / secUid / past handles to each account's current handle"""
+    def __init__(self, path=DEFAULT_INDEX_PATH, commit_every=100, commit_interval=2.0):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._db = None
+        self._writes = 0
+        self._committed = time.time()
+        self._lock = threading.Lock()
+    
+    def _connect(self):
+        # Opened on first use so runs that never scrape do not load sqlite3
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            # Batched writes would be rolled back by an exit that skips close()
+            atexit.register(self.close)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS accounts (
+                    user_id TEXT PRIMARY KEY,
+                    sec_uid TEXT,
+                    unique_id TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS accounts_sec_uid ON accounts (sec_uid);
+                CREATE TABLE IF NOT EXISTS handles (
+                    unique_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    PRIMARY KEY (unique_id, user_id)
+                );
+                CREATE INDEX IF NOT EXISTS handles_user_id ON handles (user_id);
+                CREATE TABLE IF NOT EXISTS renames (
+                    user_id TEXT NOT NULL,
+                    old_unique_id TEXT NOT NULL,
+                    new_unique_id TEXT NOT NULL,
+                    detected_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS renames_user_id ON renames (user_id);
+            """)
+        return self._db
+    
+    def resolve(self, identifier):
+        """(user_id, current handle) of the account with this user ID or secUid, or None"""
+        identifier = identifier.strip()
+        with self._lock:
+            return self._connect().execute(
+                "SELECT user_id, unique_id FROM accounts WHERE user_id = ? OR sec_uid = ? LIMIT 1", (identifier, identifier)
+            ).fetchone()
+    
+    def record(self, record):
+        """Index a scraped profile; returns the previous handle if the account was renamed"""
+        if not record.user_id or not record.unique_id:
+            return None
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            # Handle history, not the accounts row, so renames are caught even after forget()
+            row = db.execute(
+                "SELECT unique_id FROM handles WHERE user_id = ? ORDER BY last_seen DESC LIMIT 1", (record.user_id,)
+            ).fetchone()
+            previous = row[0] if row and row[0] != record.unique_id else None
+            db.execute("""
+                INSERT INTO accounts (user_id, sec_uid, unique_id, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    sec_uid = COALESCE(excluded.sec_uid, sec_uid), unique_id = excluded.unique_id, updated_at = excluded.updated_at
+            """, (record.user_id, record.secUid, record.unique_id, now))
+            db.execute("""
+                INSERT INTO handles (unique_id, user_id, first_seen, last_seen) VALUES (?, ?, ?, ?)
+                ON CONFLICT (unique_id, user_id) DO UPDATE SET last_seen = excluded.last_seen
+            """, (record.unique_id, record.user_id, now, now))
+            if previous:
+                db.execute(
+                    "INSERT INTO renames (user_id, old_unique_id, new_unique_id, detected_at) VALUES (?, ?, ?, ?)",
+                    (record.user_id, previous, record.unique_id, now),
+                )
+            # Commits are batched; this connection already sees its own uncommitted rows
+            self._writes += 1
+            if self._writes >= self.commit_every or now - self._committed >= self.commit_interval:
+                self._commit()
+        return previous
+    
+    def forget(self, user_id):
+        """Drop an account's current handle after it stopped leading to that account"""
+        with self._lock:
+            self._connect().execute("DELETE FROM accounts WHERE user_id = ?", (user_id,))
+            self._commit()
+    
+    def aliases(self, account):
+        """Everything known about the account behind a handle, user ID or secUid"""
+        key = account.strip().removeprefix('@')
+        with self._lock:
+            db = self._connect()
+            user_ids = [row[0] for row in db.execute(
+                "SELECT user_id FROM accounts WHERE user_id = ? OR sec_uid = ? "
+                "UNION SELECT user_id FROM handles WHERE unique_id = ?", (key, key, key.lower())
+            )]
+            found = []
+            for user_id in user_ids:
+                current = db.execute("SELECT sec_uid, unique_id FROM accounts WHERE user_id = ?", (user_id,)).fetchone()
+                found.append({
+                    'user_id': user_id,
+                    'secUid': current[0] if current else None,
+                    'unique_id': current[1] if current else None,
+                    'handles': [
+                        {'unique_id': handle, 'first_seen': datetime.fromtimestamp(first).isoformat(),
+                         'last_seen': datetime.fromtimestamp(last).isoformat()}
+                        for handle, first, last in db.execute(
+                            "SELECT unique_id, first_seen, last_seen FROM handles WHERE user_id = ? ORDER BY first_seen", (user_id,)
+                        )
+                    ],
+                    'renames': [
+                        {'from': old, 'to': new, 'detected_at': datetime.fromtimestamp(when).isoformat()}
+                        for old, new, when in db.execute(
+                            "SELECT old_unique_id, new_unique_id, detected_at FROM renames WHERE user_id = ? ORDER BY detected_at", (user_id,)
+                        )
+                    ],
+                })
+        return found
+    
+    def _commit(self):
+        if self._db is not None:
+            self._db.commit()
+        self._writes = 0
+        self._committed = time.time()
+    
+    def close(self):
+        """Commit pending updates and close the database"""
+        with self._lock:
+            if self._db is not None:
+                atexit.unregister(self.close)
+                self._commit()
+                self._db.close()
+                self._db = None
+
+# ============================================
+# METRICS
+# ============================================
+# Phase timings for the request running on this thread
+_connection_timings = threading.local()
+
+def _record_phase(name, seconds):
+    """Add seconds to a phase of the current thread's request, if one is tracked"""
+    phases = getattr(_connection_timings, 'phases', None)
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+class _TimedConnectMixin:
+    """Time DNS lookup plus TCP connect for new pooled connections"""
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._connect_time = time.perf_counter() - start
+            _record_phase('connect', self._connect_time)
+
+_timed_adapter = None
+
+def timed_adapter_class():
+    """HTTPAdapter whose new connections report connect and TLS handshake time"""
+    # Built on first use so plain --help / --latest runs never import urllib3
+    global _timed_adapter
+    if _timed_adapter is not None:
+        return _timed_adapter
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    
+    class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+        pass
+    
+    class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+        def connect(self):
+            self._connect_time = 0.0
+            start = time.perf_counter()
+            super().connect()
+            _record_phase('tls', time.perf_counter() - start - self._connect_time)
+    
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+    
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+    
+    class TimedHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                'http': TimedHTTPConnectionPool,
+                'https': TimedHTTPSConnectionPool,
+            }
+        
+        def proxy_manager_for(self, proxy, **proxy_kwargs):
+            manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+            # SOCKS managers bring their own connection classes
+            if not proxy.lower().startswith('socks'):
+                manager.pool_classes_by_scheme = {
+                    'http': TimedHTTPConnectionPool,
+                    'https': TimedHTTPSConnectionPool,
+                }
+            return manager
+    
+    _timed_adapter = TimedHTTPAdapter
+    return _timed_adapter
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (Prometheus-style upper bounds)"""
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+    
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if i == len(self.BUCKETS):
+                    return self.BUCKETS[-1]
+                lower = self.BUCKETS[i - 1] if i else 0.0
+                return lower + (self.BUCKETS[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.BUCKETS[-1]
+
+class BatchMetrics:
+    """Aggregate per-result fetch metrics into histograms and counters"""
+    PHASES = ('cache', 'connect', 'tls', 'ttfb', 'download', 'decode', 'extract', 'total')
+    
+    def __init__(self):
+        self.histograms = {phase: LatencyHistogram() for phase in self.PHASES}
+        self.results = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.refetches = 0
+        self.throttled = 0
+        self.pool_drops = 0
+        self.status_counts = {}
+        self.source_counts = {}
+        self.started = time.time()
+    
+    def observe(self, user_data):
+        """Fold one fetch_user_info result into the aggregates"""
+        self.results += 1
+        if "error" in user_data:
+            self.errors += 1
+        else:
+            source = user_data.get('source', 'network')
+            self.source_counts[source] = self.source_counts.get(source, 0) + 1
+        
+        metrics = user_data.get('metrics')
+        if not metrics:
+            return
+        for phase, seconds in metrics['phases'].items():
+            self.histograms[phase].observe(seconds)
+        self.bytes_received += metrics['bytes']
+        self.retries += metrics['retries']
+        self.refetches += metrics.get('attempts', 1) - 1
+        self.throttled += metrics.get('throttled', 0)
+        self.pool_drops += metrics.get('pool_drop', False)
+        if metrics['status'] is not None:
+            status = str(metrics['status'])
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+    
+    def summary(self):
+        """JSON-ready summary with per-phase mean and quantiles in milliseconds"""
+        phases = {}
+        for phase, histogram in self.histograms.items():
+            if histogram.count:
+                phases[phase] = {
+                    'count': histogram.count,
+                    'mean_ms': round(histogram.sum / histogram.count * 1000, 2),
+                    'p50_ms': round(histogram.quantile(0.5) * 1000, 2),
+                    'p90_ms': round(histogram.quantile(0.9) * 1000, 2),
+                    'p99_ms': round(histogram.quantile(0.99) * 1000, 2),
+                }
+        return {
+            'elapsed_s': round(time.time() - self.started, 3),
+            'results': self.results,
+            'errors': self.errors,
+            'bytes_received': self.bytes_received,
+            'retries': self.retries,
+            'refetches': self.refetches,
+            'throttled': self.throttled,
+            'pool_drops': self.pool_drops,
+            'status_codes': self.status_counts,
+            'sources': self.source_counts,
+            'phases': phases,
+        }
+    
+    def summary_line(self):
+        """One-line mean time per phase, for terminal output"""
+        parts = []
+        for phase in self.PHASES:
+            histogram = self.histograms[phase]
+            if histogram.count:
+                parts.append(f"{phase} {histogram.sum / histogram.count * 1000:.1f}ms")
+        return ' | '.join(parts)
+    
+    def to_prometheus(self):
+        """Render the aggregates in Prometheus text exposition format"""
+        lines = [
+            '# HELP tiktok_scraper_phase_seconds Time spent per fetch phase.',
+            '# TYPE tiktok_scraper_phase_seconds histogram',
+        ]
+        for phase, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.BUCKETS, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'tiktok_scraper_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+            lines.append(f'tiktok_scraper_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {histogram.count}')
+            lines.append(f'tiktok_scraper_phase_seconds_sum{{phase="{phase}"}} {histogram.sum:.6f}')
+            lines.append(f'tiktok_scraper_phase_seconds_count{{phase="{phase}"}} {histogram.count}')
+        
+        lines += [
+            '# HELP tiktok_scraper_results_total Results by outcome.',
+            '# TYPE tiktok_scraper_results_total counter',
+            f'tiktok_scraper_results_total{{outcome="ok"}} {self.results - self.errors}',
+            f'tiktok_scraper_results_total{{outcome="error"}} {self.errors}',
+            '# HELP tiktok_scraper_bytes_received_total Response body bytes read from the network.',
+            '# TYPE tiktok_scraper_bytes_received_total counter',
+            f'tiktok_scraper_bytes_received_total {self.bytes_received}',
+            '# HELP tiktok_scraper_retries_total Transport-level retries.',
+            '# TYPE tiktok_scraper_retries_total counter',
+            f'tiktok_scraper_retries_total {self.retries}',
+            '# HELP tiktok_scraper_refetches_total Profiles fetched again after throttling or transient errors.',
+            '# TYPE tiktok_scraper_refetches_total counter',
+            f'tiktok_scraper_refetches_total {self.refetches}',
+            '# HELP tiktok_scraper_throttled_total Responses that were 429s, soft blocks or captcha pages.',
+            '# TYPE tiktok_scraper_throttled_total counter',
+            f'tiktok_scraper_throttled_total {self.throttled}',
+            '# HELP tiktok_scraper_pool_drops_total Streamed fetches whose connection was closed instead of reused.',
+            '# TYPE tiktok_scraper_pool_drops_total counter',
+            f'tiktok_scraper_pool_drops_total {self.pool_drops}',
+            '# HELP tiktok_scraper_http_responses_total Final HTTP status codes.',
+            '# TYPE tiktok_scraper_http_responses_total counter',
+        ]
+        lines += [f'tiktok_scraper_http_responses_total{{code="{code}"}} {count}' for code, count in sorted(self.status_counts.items())]
+        lines += [
+            '# HELP tiktok_scraper_results_by_source_total Successful results by origin.',
+            '# TYPE tiktok_scraper_results_by_source_total counter',
+        ]
+        lines += [f'tiktok_scraper_results_by_source_total{{source="{source}"}} {count}' for source, count in sorted(self.source_counts.items())]
+        return '\n'.join(lines) + '\n'
+    
+    def write(self, path):
+        """Atomically write a .prom textfile or a JSON summary, chosen by extension"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if path.endswith('.prom'):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.summary(), f, indent=2)
+        os.replace(tmp_path, path)
+
+# ============================================
+# PROXY POOL
+# ============================================
+PROXY_SCHEMES = ('http', 'https', 'socks4', 'socks4a', 'socks5', 'socks5h')
+
+@dataclass(slots=True)
+class ProxyState:
+    """Load and health of one egress proxy"""
+    url: str
+    in_flight: int = 0
+    latency: float = None
+    error_rate: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    streak: int = 0
+    ejections: int = 0
+    probing: bool = False
+    next_free: float = 0.0
+    ejected_until: float = 0.0
+    
+    @property
+    def mapping(self):
+        """requests-style proxies argument routing every scheme through this proxy"""
+        return {'http': self.url, 'https': self.url}
+    
+    def to_dict(self):
+        return {
+            'url': self.url, 'requests': self.requests, 'failures': self.failures,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3), 'ejections': self.ejections, 'in_flight': self.in_flight,
+        }
+
+class ProxyPool:
+    """Egress proxies balanced by observed latency and error rate, each with its own concurrency limit and cooldown"""
+    def __init__(self, proxies, max_in_flight=4, cooldown=0.0, eject_after=3, eject_ratio=0.5,
+                 eject_seconds=30.0, max_eject_seconds=600.0, smoothing=0.2, wait_timeout=30.0, clock=time.monotonic):
+        self.proxies = [ProxyState(self.parse(proxy)) for proxy in dict.fromkeys(proxies)]
+        if not self.proxies:
+            raise ValueError("proxy pool is empty")
+        import importlib.util
+        if any(proxy.url.startswith('socks') for proxy in self.proxies) and importlib.util.find_spec('socks') is None:
+            raise ValueError("SOCKS proxies need PySocks: pip install 'requests[socks]'")
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.cooldown = cooldown
+        self.eject_after = eject_after
+        self.eject_ratio = eject_ratio
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.smoothing = smoothing
+        self.wait_timeout = wait_timeout
+        self.clock = clock
+        self._cond = threading.Condition()
+    
+    @staticmethod
+    def parse(spec):
+        """Proxy URL with an explicit scheme; host:port means an HTTP proxy"""
+        spec = spec.strip()
+        if '://' not in spec:
+            spec = 'http://' + spec
+        scheme = spec.split('://', 1)[0].lower()
+        if scheme not in PROXY_SCHEMES:
+            raise ValueError(f"unsupported proxy scheme: {scheme}")
+        return spec
+    
+    @staticmethod
+    def read_list(filename):
+        """Proxy URLs listed one per line in filename; # starts a comment"""
+        specs = (line.split('#', 1)[0].strip() for line in iter_identifiers(filename))
+        return [spec for spec in specs if spec]
+    
+    def __len__(self):
+        return len(self.proxies)
+    
+    def _cost(self, proxy):
+        """Expected seconds to serve one more request through proxy; lower is better"""
+        # Unmeasured proxies borrow the pool's best latency so they get tried early
+        measured = [p.latency for p in self.proxies if p.latency is not None]
+        latency = proxy.latency if proxy.latency is not None else (min(measured) if measured else 1.0)
+        return latency * (1 + proxy.in_flight) / max(0.05, 1.0 - proxy.error_rate)
+    
+    def _limit(self, proxy):
+        # A proxy back from ejection gets a single probe request until it succeeds
+        return 1 if proxy.probing else self.max_in_flight
+    
+    def acquire(self):
+        """Reserve the cheapest usable proxy, waiting while every proxy is busy, cooling down or ejected"""
+        deadline = self.clock() + self.wait_timeout
+        with self._cond:
+            while True:
+                now = self.clock()
+                ready = [
+                    p for p in self.proxies
+                    if p.in_flight < self._limit(p) and p.next_free <= now and p.ejected_until <= now
+                ]
+                if ready:
+                    proxy = min(ready, key=self._cost)
+                    proxy.in_flight += 1
+                    proxy.requests += 1
+                    proxy.next_free = now + self.cooldown
+                    return proxy
+                if now >= deadline:
+                    raise requests.exceptions.ProxyError("No healthy proxy available")
+                # Sleep until the next cooldown or ejection ends, or a request finishes
+                wake = min(
+                    [max(p.next_free, p.ejected_until) for p in self.proxies if max(p.next_free, p.ejected_until) > now]
+                    or [deadline]
+                )
+                self._cond.wait(min(wake, deadline) - now)
+    
+    def release(self, proxy, outcome, latency=None, retry_after=None):
+        """Return a proxy with its request's outcome: 'ok', 'throttled' or 'error'"""
+        with self._cond:
+            now = self.clock()
+            proxy.in_flight -= 1
+            failed = outcome != 'ok'
+            proxy.error_rate += self.smoothing * (failed - proxy.error_rate)
+            if not failed:
+                proxy.streak = 0
+                proxy.probing = False
+                if proxy.error_rate < self.eject_ratio / 4:
+                    # Healthy again: the next ejection starts from the base time
+                    proxy.ejections = 0
+                if latency is not None:
+                    proxy.latency = latency if proxy.latency is None else proxy.latency + self.smoothing * (latency - proxy.latency)
+            else:
+                proxy.failures += 1
+                proxy.streak += 1
+                if outcome == 'throttled' and retry_after:
+                    # The site blocked this egress address; let it cool down on its own
+                    proxy.next_free = max(proxy.next_free, now + retry_after)
+                if proxy.probing or proxy.streak >= self.eject_after or (
+                    proxy.requests >= 2 * self.eject_after and proxy.error_rate >= self.eject_ratio
+                ):
+                    self._eject(proxy, now)
+            self._cond.notify_all()
+    
+    def _eject(self, proxy, now):
+        """Take proxy out of rotation, longer each time it is ejected again"""
+        proxy.ejected_until = now + min(self.max_eject_seconds, self.eject_seconds * 2 ** proxy.ejections)
+        proxy.ejections += 1
+        proxy.streak = 0
+        proxy.probing = True
+        # Start the probe from a neutral score rather than the failure rate that got it ejected
+        proxy.error_rate = self.eject_ratio / 2
+    
+    def healthy(self):
+        """Number of proxies currently in rotation"""
+        now = self.clock()
+        with self._cond:
+            return sum(1 for p in self.proxies if p.ejected_until <= now)
+    
+    def stats(self):
+        """Per-proxy counters, latency and health as plain dicts"""
+        with self._cond:
+            return [proxy.to_dict() for proxy in self.proxies]
+
 # ============================================
 # TIKTOK SCRAPER CLASS
 # ============================================
 class TikTokScraper:
-    def __init__(self, use_colors=True):
+    def __init__(self, use_colors=True, pool_size=10, retries=3, stream=True, cache=None, base_url="https://www.tiktok.com", quiet=False, proxies=None, identity=None):
         self.use_colors = use_colors
+        self.quiet = quiet
+        self.base_url = base_url.rstrip('/')
+        self.stream = stream
+        self.cache = cache
+        self.proxies = proxies
+        self.identity = identity
+        self.pool_size = pool_size
+        self.retries = retries
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -151,6 +1543,60 @@ class TikTokScraper:
             'Sec-Fetch-User': '?1',
             'Cache-Control': 'max-age=0',
         }
+        # Built on first request so display-only callers (--latest, --aliases) never load requests
+        self._session = None
+        self._session_lock = threading.Lock()
+    
+    @property
+    def session(self):
+        """Keep-alive session, created on first use"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+    
+    def _build_session(self):
+        """Create a keep-alive session shared by page and avatar requests"""
+        from requests.adapters import Retry
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+            # 429/Retry-After go back to the caller so the batch throttle can slow every worker down
+            respect_retry_after_header=False,
+        )
+        adapter = timed_adapter_class()(pool_connections=4, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def ensure_pool_size(self, pool_size):
+        """Grow the per-host pool so it can serve pool_size requests at once"""
+        if pool_size > self.pool_size:
+            self.pool_size = pool_size
+            with self._session_lock:
+                if self._session is not None:
+                    self._session.close()
+                    self._session = None
+    
+    def close(self):
+        """Release pooled connections, the response cache and the identity index"""
+        if self._session is not None:
+            self._session.close()
+        if self.cache:
+            self.cache.close()
+        if self.identity:
+            self.identity.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
         
     def colorize(self, text, color_code):
         """Apply color if enabled"""
@@ -158,176 +1604,440 @@ class TikTokScraper:
             return f"{color_code}{text}{C.RESET}"
         return text
     
+    def profile_url(self, identifier, by_id=False):
+        """Build the profile page URL for a username or user ID"""
+        identifier = normalize_identifier(identifier, by_id)
+        return f"{self.base_url}/@{identifier}" if not by_id else f"{self.base_url}/@user{identifier}"
+    
     def fetch_user_info(self, identifier, by_id=False):
         """Fetch user information from TikTok"""
+        for _ in range(2):
+            page = self.fetch_page(identifier, by_id)
+            if "error" in page:
+                result = page
+            else:
+                try:
+                    parsed = parse_profile_page(page.pop('body'), page['encoding'])
+                except Exception as e:
+                    parsed = e
+                result = self.finish_page(page, parsed)
+            # A stale index entry was just dropped; the second pass uses the ID URL
+            if not (result.get('metrics') or {}).get('stale_identity'):
+                break
+        return result
+    
+    def fetch_page(self, identifier, by_id=False):
+        """Fetch stage: download a profile page as raw bytes, or return an error result"""
         start_time = time.time()
-        
-        # Clean identifier
-        if not by_id and identifier.startswith('@'):
-            identifier = identifier[1:]
-        
-        url = f"https://www.tiktok.com/@{identifier}" if not by_id else f"https://www.tiktok.com/@user{identifier}"
+        metrics = {'phases': {}, 'bytes': 0, 'status': None, 'retries': 0}
         
         try:
-            print(f"\n{self.colorize('🌐', C.BRIGHT_CYAN)} {self.colorize('Fetching data from TikTok...', C.CYAN)}")
-            response = requests.get(url, headers=self.headers, timeout=15)
+            if by_id and self.identity:
+                # Known accounts are fetched by their current handle, not the guessed /@user<ID> URL
+                known = self.identity.resolve(identifier)
+                if known:
+                    metrics['resolved'] = known[0]
+                    identifier, by_id = known[1], False
+            url = self.profile_url(identifier, by_id)
+            if not self.quiet:
+                print(f"\n{self.colorize('🌐', C.BRIGHT_CYAN)} {self.colorize('Fetching data from TikTok...', C.CYAN)}")
+            status_code, body, encoding, source = self._fetch_body(url, metrics)
             
-            if response.status_code != 200:
-                return {"error": f"Failed to fetch user (Status: {response.status_code})"}
+            if metrics.get('throttle'):
+                return {"error": f"Throttled by TikTok ({metrics['throttle']}, status {status_code})", "metrics": metrics}
+            if status_code != 200:
+                if metrics.get('resolved'):
+                    self._drop_identity(metrics)
+                return {"error": f"Failed to fetch user (Status: {status_code})", "metrics": metrics}
             
-            # Parse HTML
-            try:
-                soup = BeautifulSoup(response.text, 'lxml')
-            except:
-                soup = BeautifulSoup(response.text, 'html.parser')
+            return {'url': url, 'body': body, 'encoding': encoding, 'source': source,
+                    'metrics': metrics, 'start_time': start_time}
             
-            # Extract data
-            user_data = self._extract_data(response.text)
+        except requests.RequestException as e:
+            return {"error": f"Network error: {str(e)}", "metrics": metrics}
+        except Exception as e:
+            return {"error": f"Unexpected error: {str(e)}", "metrics": metrics}
+        finally:
+            metrics['phases']['total'] = time.time() - start_time
+    
+    def finish_page(self, page, parsed):
+        """Attach fetch metadata to a parse_profile_page result (or the exception it raised)"""
+        metrics = page['metrics']
+        try:
+            if isinstance(parsed, Exception):
+                return {"error": f"Unexpected error: {str(parsed)}", "metrics": metrics}
             
+            user_data, phases = parsed
+            metrics['phases'].update(phases)
             if "error" in user_data:
-                return user_data
+                if metrics.get('resolved'):
+                    # The indexed handle now leads nowhere; the second pass asks by ID
+                    self._drop_identity(metrics)
+                return {**user_data, "metrics": metrics}
+            
+            if metrics.get('resolved') and user_data.user_id != metrics['resolved']:
+                self._drop_identity(metrics)
+                return {"error": "Indexed handle no longer leads to this account", "metrics": metrics}
+            if self.identity:
+                renamed = self.identity.record(user_data)
+                if renamed:
+                    metrics['renamed_from'] = renamed
             
             # Calculate fetch time
-            fetch_time = time.time() - start_time
+            fetch_time = time.time() - page['start_time']
             
             # Add metadata
-            user_data['fetch_time'] = f"{fetch_time:.2f}s"
-            user_data['timestamp'] = datetime.now().isoformat()
-            user_data['url'] = url
+            user_data.fetch_time = round(fetch_time, 3)
+            user_data.timestamp = datetime.now().isoformat()
+            user_data.url = page['url']
+            user_data.source = page['source']
+            user_data.metrics = metrics
             
             return user_data
-            
-        except requests.RequestException as e:
-            return {"error": f"Network error: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Unexpected error: {str(e)}"}
-    
-    def _extract_data(self, html_content):
-        """Extract user data from HTML"""
-        patterns = {
-            'user_id': r'"webapp\.user-detail"[^}]*"id":"(\d+)"',
-            'unique_id': r'"uniqueId":"([^"]+)"',
-            'nickname': r'"nickname":"([^"]+)"',
-            'followers': r'"followerCount":(\d+)',
-            'following': r'"followingCount":(\d+)',
-            'likes': r'"heartCount":(\d+)',
-            'videos': r'"videoCount":(\d+)',
-            'signature': r'"signature":"([^"]*?)"',
-            'verified': r'"verified":(true|false)',
-            'secUid': r'"secUid":"([^"]+)"',
-            'privateAccount': r'"privateAccount":(true|false)',
-            'region': r'"region":"([^"]*)"',
-            'diggCount': r'"diggCount":(\d+)',
-            'friendCount': r'"friendCount":(\d+)',
-            'avatarLarger': r'"avatarLarger":"([^"]+)"',
-            'createTime': r'"createTime":(\d+)',
-        }
+        finally:
+            metrics['phases']['total'] = time.time() - page['start_time']
+    
+    def _drop_identity(self, metrics):
+        """Forget a resolved handle that failed; the caller retries by ID"""
+        self.identity.forget(metrics['resolved'])
+        metrics['stale_identity'] = True
+    
+    def _fetch_body(self, url, metrics=None):
+        """GET a profile page and return (status_code, body bytes, encoding, source)"""
+        metrics = metrics if metrics is not None else {'phases': {}, 'bytes': 0, 'status': None, 'retries': 0}
+        phases = metrics['phases']
         
-        info = {}
-        for key, pattern in patterns.items():
-            match = re.search(pattern, html_content)
-            if match:
-                info[key] = match.group(1)
-            else:
-                # Try alternative patterns
-                alt_patterns = {
-                    'user_id': r'"userId":"(\d+)"',
-                    'unique_id': r'"uniqueId":"([^"]+)"',
-                    'nickname': r'"nickName":"([^"]+)"',
-                }
-                if key in alt_patterns:
-                    alt_match = re.search(alt_patterns[key], html_content)
-                    info[key] = alt_match.group(1) if alt_match else "N/A"
-                else:
-                    info[key] = "N/A"
+        entry = None
+        if self.cache:
+            lookup_start = time.perf_counter()
+            entry = self.cache.get(url)
+            phases['cache'] = time.perf_counter() - lookup_start
+        if entry and self.cache.is_fresh(entry):
+            return 200, entry['body'], 'utf-8', 'cache'
         
-        # Clean up data
-        info['signature'] = info.get('signature', '').replace('\\n', '\n').replace('\\"', '"')
+        headers = dict(self.headers, **self.cache.validators(entry)) if entry else self.headers
         
-        # Extract social links
-        info['social_links'] = self._extract_social_links(html_content, info.get('signature', ''))
+        with self._egress(metrics) as proxies:
+            return self._fetch_network(url, headers, entry, metrics, proxies)
+    
+    @contextmanager
+    def _egress(self, metrics):
+        """Route the enclosed request through the cheapest pool proxy and report its outcome back"""
+        if not self.proxies:
+            yield None
+            return
+        proxy = self.proxies.acquire()
+        metrics['proxy'] = proxy.url
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield proxy.mapping
+            status = metrics.get('status') or 0
+            if metrics.get('throttle') or status in THROTTLE_STATUSES:
+                outcome = 'throttled'
+            elif 0 < status < 500:
+                outcome = 'ok'
+        finally:
+            self.proxies.release(proxy, outcome, time.perf_counter() - start, metrics.get('retry_after'))
+    
+    def _fetch_network(self, url, headers, entry, metrics, proxies=None):
+        """Network half of _fetch_body"""
+        phases = metrics['phases']
+        # Connection classes add connect/TLS time for this thread's request
+        _connection_timings.phases = phases
+        request_start = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers, timeout=15, stream=self.stream, proxies=proxies)
+        finally:
+            _connection_timings.phases = None
+        phases['ttfb'] = time.perf_counter() - request_start - phases.get('connect', 0.0) - phases.get('tls', 0.0)
+        metrics['status'] = response.status_code
+        retries = getattr(response.raw, 'retries', None)
+        metrics['retries'] = len(retries.history) if retries else 0
         
-        # Format numbers
-        info['followers'] = self._format_number(info.get('followers', '0'))
-        info['following'] = self._format_number(info.get('following', '0'))
-        info['likes'] = self._format_number(info.get('likes', '0'))
-        info['videos'] = self._format_number(info.get('videos', '0'))
+        try:
+            if response.status_code == 304 and entry:
+                self.cache.touch(url)
+                return 200, entry['body'], 'utf-8', 'revalidated'
+            
+            if response.status_code in THROTTLE_STATUSES:
+                metrics['throttle'] = THROTTLE_STATUSES[response.status_code]
+                metrics['retry_after'] = parse_retry_after(response.headers.get('Retry-After'))
+            if response.status_code != 200:
+                return response.status_code, None, None, 'network'
+            
+            download_start = time.perf_counter()
+            body = self._read_until_user_detail(response, metrics) if self.stream else response.content
+            phases['download'] = time.perf_counter() - download_start
+            metrics['bytes'] = response.raw.tell()
+        finally:
+            response.close()
         
-        # Boolean conversions
-        info['verified'] = info.get('verified', 'false').lower() == 'true'
-        info['privateAccount'] = info.get('privateAccount', 'false').lower() == 'true'
+        # Captcha and verification interstitials come back as 200 without any page state
+        has_state = any(marker in body for marker in REHYDRATION_MARKERS)
+        if not has_state:
+            lowered = body[:256 * 1024].lower()
+            if any(marker in lowered for marker in CHALLENGE_MARKERS):
+                metrics['throttle'] = 'captcha'
+                metrics['retry_after'] = parse_retry_after(response.headers.get('Retry-After'))
+                return 200, None, None, 'network'
         
-        # Format creation date
-        if info.get('createTime', '0') != 'N/A' and info['createTime'] != '0':
-            try:
-                create_date = datetime.fromtimestamp(int(info['createTime']))
-                info['createTime'] = create_date.strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                pass
+        # Bodies stay bytes until the parse stage; only rare non-UTF-8 pages are transcoded here
+        encoding = response.encoding or 'utf-8'
+        if codecs.lookup(encoding).name != 'utf-8':
+            body = body.decode(encoding, errors='replace').encode('utf-8')
         
-        return info
+        # Only cache real profile pages, never block or error pages
+        if self.cache and has_state:
+            self.cache.put(url, body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return 200, body, 'utf-8', 'network'
     
-    def _extract_social_links(self, html_content, bio):
-        """Extract social links from HTML and bio"""
-        social_links = []
+    def _read_until_user_detail(self, response, metrics=None):
+        """Read body chunks until the rehydration script has been fully received"""
+        buffer = bytearray()
+        script_start = -1
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            # Re-scan a marker's width of old data so split markers still match
+            scan_from = max(0, len(buffer) - MAX_MARKER_LEN)
+            buffer += chunk
+            
+            if script_start == -1:
+                hits = [i for i in (buffer.find(m, scan_from) for m in REHYDRATION_MARKERS) if i != -1]
+                if not hits:
+                    continue
+                script_start = scan_from = min(hits)
+            
+            if buffer.find(SCRIPT_END, scan_from) != -1:
+                if not self._finish_early(response) and metrics is not None:
+                    metrics['pool_drop'] = True
+                break
         
-        # Method 1: TikTok bio links
-        link_patterns = [
-            r'href="https://www\.tiktok\.com/link/v2\?[^"]*?target=([^"&]+)"',
-            r'scene=bio_url[^"]*?target=([^"&]+)',
-            r'"bioLink":{"link":"([^"]+)"',
-            r'"shareUrl":"([^"]+)"',
-        ]
+        return buffer
+    
+    def _finish_early(self, response):
+        """Drain a short remainder to keep the connection pooled; returns False when it is dropped instead"""
+        try:
+            remaining = int(response.headers.get('Content-Length', '')) - response.raw.tell()
+        except ValueError:
+            # Chunked or compressed without a length: drain until the limit, then give up
+            remaining = None
+        if remaining is not None and not 0 <= remaining <= STREAM_DRAIN_LIMIT:
+            return False
+        # raw.tell() does not advance on chunked reads, so count what was drained
+        drained = 0
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            drained += len(chunk)
+            if drained > STREAM_DRAIN_LIMIT:
+                return False
+        return True
+    
+    def iter_videos(self, account, by_id=False, page_size=VIDEO_PAGE_SIZE, limit=None, prefetch=1):
+        """Stream VideoRecords for an account's posts, newest first; a failure ends the stream with an error dict"""
+        if isinstance(account, str):
+            account = self.fetch_user_info(account, by_id)
+        if "error" in account:
+            yield account
+            return
+        if not account.get('secUid'):
+            yield {"error": "Profile has no secUid to page videos by"}
+            return
         
-        for pattern in link_patterns:
-            matches = re.findall(pattern, html_content)
-            for match in matches:
+        stop = threading.Event()
+        pages = self._video_pages(account['secUid'], account.get('unique_id'), page_size, stop)
+        if prefetch > 0:
+            pages = self._prefetch(pages, prefetch, stop)
+        count = 0
+        try:
+            for page in pages:
+                if "error" in page:
+                    yield page
+                    return
+                for video in page['videos']:
+                    yield video
+                    count += 1
+                    if limit and count >= limit:
+                        return
+        finally:
+            stop.set()
+            pages.close()
+    
+    def _prefetch(self, pages, depth, stop):
+        """Pull pages on a helper thread so the next one downloads while the caller works through this one"""
+        from queue import Queue, Full
+        ready = Queue(maxsize=depth)
+        
+        def offer(item):
+            while not stop.is_set():
                 try:
-                    decoded = urllib.parse.unquote(match)
-                    if decoded.startswith(('http://', 'https://', 'www.')):
-                        if decoded not in social_links:
-                            social_links.append(decoded)
-                except:
-                    pass
+                    ready.put(item, timeout=0.2)
+                    return True
+                except Full:
+                    continue
+            return False
         
-        # Method 2: Social media mentions in bio
-        social_patterns = {
-            'instagram': [r'[iI][gG][\s:]*@?([a-zA-Z0-9._]+)', r'instagram\.com/([a-zA-Z0-9._]+)'],
-            'twitter': [r'[tT]witter[\s:]*@?([a-zA-Z0-9._]+)', r'twitter\.com/([a-zA-Z0-9._]+)', r'x\.com/([a-zA-Z0-9._]+)'],
-            'youtube': [r'[yY][tT][\s:]*@?([a-zA-Z0-9._]+)', r'youtube\.com/([a-zA-Z0-9._]+)'],
-            'snapchat': [r'[sS]napchat[\s:]*@?([a-zA-Z0-9._]+)', r'snapchat\.com/add/([a-zA-Z0-9._]+)'],
-            'facebook': [r'[fF][bB][\s:]*@?([a-zA-Z0-9._]+)', r'facebook\.com/([a-zA-Z0-9._]+)'],
-            'telegram': [r'[tT]elegram[\s:]*@?([a-zA-Z0-9._]+)', r't\.me/([a-zA-Z0-9._]+)'],
-        }
+        def produce():
+            try:
+                for page in pages:
+                    if not offer(page):
+                        return
+            except Exception as e:
+                offer({"error": f"Unexpected error: {str(e)}"})
+            offer(None)
         
-        for platform, patterns in social_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, bio)
-                if match:
-                    username = match.group(1)
-                    social_links.append(f"{platform}:{username}")
+        threading.Thread(target=produce, daemon=True).start()
+        while True:
+            page = ready.get()
+            if page is None:
+                return
+            yield page
+    
+    def _video_pages(self, sec_uid, unique_id, page_size, stop):
+        """Walk the item_list cursor, yielding one compact page at a time"""
+        cursor = '0'
+        while not stop.is_set():
+            for attempt in range(self.retries + 1):
+                page = self.fetch_video_page(sec_uid, cursor, page_size, unique_id)
+                retry_after = (page.get('metrics') or {}).get('retry_after')
+                if classify_result(page) != 'throttled' or attempt == self.retries:
                     break
+                if stop.wait(min(retry_after or 2 ** attempt, 30)):
+                    return
+            yield page
+            if "error" in page or not page['has_more'] or not page['videos']:
+                return
+            cursor = page['cursor']
+    
+    def fetch_video_page(self, sec_uid, cursor='0', count=VIDEO_PAGE_SIZE, unique_id=None):
+        """One item_list page as {'videos', 'cursor', 'has_more', 'metrics'}, or an error result"""
+        start_time = time.time()
+        metrics = {'phases': {}, 'bytes': 0, 'status': None, 'retries': 0}
+        query = urllib.parse.urlencode({'aid': 1988, 'secUid': sec_uid, 'count': count, 'cursor': cursor})
+        url = f"{self.base_url}/api/post/item_list/?{query}"
+        headers = dict(self.headers, **VIDEO_PAGE_HEADERS)
+        if unique_id:
+            headers['Referer'] = self.profile_url(unique_id)
         
-        # Method 3: Email addresses
-        email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', bio)
-        if email_match:
-            social_links.append(f"email:{email_match.group(0)}")
+        try:
+            with self._egress(metrics) as proxies:
+                request_start = time.perf_counter()
+                response = self.session.get(url, headers=headers, timeout=15, proxies=proxies)
+                metrics['phases']['ttfb'] = time.perf_counter() - request_start
+                metrics['status'] = response.status_code
+                metrics['bytes'] = len(response.content)
+                if response.status_code in THROTTLE_STATUSES:
+                    metrics['throttle'] = THROTTLE_STATUSES[response.status_code]
+                    metrics['retry_after'] = parse_retry_after(response.headers.get('Retry-After'))
+            
+            if metrics.get('throttle'):
+                return {"error": f"Throttled by TikTok ({metrics['throttle']}, status {response.status_code})", "metrics": metrics}
+            if response.status_code != 200:
+                return {"error": f"Failed to fetch videos (Status: {response.status_code})", "metrics": metrics}
+            # Unsigned or blocked requests get an empty 200 rather than an error status
+            if not response.content.strip():
+                metrics['throttle'] = 'empty response'
+                return {"error": "Throttled by TikTok (empty video page)", "metrics": metrics}
+            
+            parse_start = time.perf_counter()
+            # json.loads, not response.json(): its decode error is also a RequestException
+            data = json.loads(response.content)
+            if not isinstance(data, dict):
+                return {"error": f"Malformed video page: expected an object, got {type(data).__name__}", "metrics": metrics}
+            if data.get('statusCode'):
+                return {"error": f"Video list unavailable: {data.get('statusMsg') or data['statusCode']}", "metrics": metrics}
+            items = data.get('itemList') or []
+            if not isinstance(items, list):
+                return {"error": f"Malformed video page: itemList is {type(items).__name__}", "metrics": metrics}
+            videos = [VideoRecord.from_item(item, self.base_url, unique_id) for item in items if isinstance(item, dict)]
+            metrics['phases']['parse'] = time.perf_counter() - parse_start
+            return {'videos': videos, 'cursor': str(data.get('cursor') or '0'),
+                    'has_more': bool(data.get('hasMore')), 'metrics': metrics}
+        
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return {"error": f"Malformed video page: {str(e)}", "metrics": metrics}
+        except requests.RequestException as e:
+            return {"error": f"Network error: {str(e)}", "metrics": metrics}
+        finally:
+            metrics['phases']['total'] = time.time() - start_time
+
+    @classmethod
+    def _extract_data(cls, html_content):
+        """Extract user data from HTML, or an error result for a page without a user"""
+        info = cls._extract_state_fields(html_content)
+        if info is None:
+            info = cls._extract_regex_fields(html_content)
+            # Nothing that identifies an account means there is no profile on this page
+            if not info.get('user_id') and not info.get('unique_id'):
+                return {"error": "User not found (no user data in page)"}
+        elif "error" in info:
+            return info
+        
+        # Extract social links
+        info['social_links'] = cls._extract_social_links(html_content, info.get('signature') or '')
+        
+        return ProfileRecord.from_dict(info)
+    
+    @classmethod
+    def _extract_state_fields(cls, html_content):
+        """Read profile fields from the rehydration script; None when there is no usable script to read"""
+        bounds = find_rehydration_json(html_content)
+        if bounds is None:
+            return None
+        
+        try:
+            state = json.loads(html_content[bounds[0]:bounds[1]])
+        except ValueError:
+            return None
+        
+        if not isinstance(state, dict):
+            return None
+        detail = user_detail_from_state(state)
+        if detail is None:
+            # A readable state without a user is a missing account; the page-wide regex
+            # scan would only pick up app-context fields and report an empty profile
+            return missing_user_error(state)
+        
+        info = {}
+        for key, (section, field) in USER_DETAIL_FIELDS.items():
+            info[key] = (detail.get(section) or {}).get(field)
+        return info
+    
+    @classmethod
+    def _extract_regex_fields(cls, html_content):
+        """Fallback field extraction with one regex per field"""
+        info = {}
+        for key, pattern in PROFILE_PATTERNS.items():
+            match = pattern.search(html_content)
+            if match:
+                info[key] = match.group(1)
+            else:
+                # Try alternative patterns
+                if key in PROFILE_ALT_PATTERNS:
+                    alt_match = PROFILE_ALT_PATTERNS[key].search(html_content)
+                    info[key] = alt_match.group(1) if alt_match else None
+                else:
+                    info[key] = None
         
-        return list(set(social_links))[:10]  # Remove duplicates, limit to 10
+        # Clean up data
+        if info['signature'] is not None:
+            info['signature'] = info['signature'].replace('\\n', '\n').replace('\\"', '"')
+        return info
+    
+    @classmethod
+    def _extract_social_links(cls, html_content, bio):
+        """Extract social links from the page-state JSON and bio"""
+        return merge_social_links(page_links(html_content), bio)
     
-    def _format_number(self, num_str):
+    def _format_number(self, num):
         """Format large numbers with K, M, B suffixes"""
-        try:
-            num = int(num_str)
-            if num >= 1000000000:
-                return f"{num/1000000000:.1f}B"
-            elif num >= 1000000:
-                return f"{num/1000000:.1f}M"
-            elif num >= 1000:
-                return f"{num/1000:.1f}K"
-            return str(num)
-        except:
-            return num_str
+        if num is None:
+            return "N/A"
+        if num >= 1000000000:
+            return f"{num/1000000000:.1f}B"
+        elif num >= 1000000:
+            return f"{num/1000000:.1f}M"
+        elif num >= 1000:
+            return f"{num/1000:.1f}K"
+        return str(num)
     
     def display_user_info(self, user_data):
         """Display user information in a beautiful format"""
@@ -343,6 +2053,9 @@ class TikTokScraper:
         print(f"\n{self.colorize('📋 BASIC INFORMATION', C.BRIGHT_YELLOW)}")
         print(f"{self.colorize('─'*40, C.CYAN)}")
         print(f"{self.colorize('Username:', C.GREEN)} {self.colorize('@' + user_data.get('unique_id', 'N/A'), C.BRIGHT_WHITE)}")
+        renamed = (user_data.get('metrics') or {}).get('renamed_from')
+        if renamed:
+            print(f"{self.colorize('Formerly:', C.GREEN)} {self.colorize('@' + renamed, C.YELLOW)}")
         print(f"{self.colorize('Nickname:', C.GREEN)} {self.colorize(user_data.get('nickname', 'N/A'), C.WHITE)}")
         print(f"{self.colorize('User ID:', C.GREEN)} {self.colorize(user_data.get('user_id', 'N/A'), C.WHITE)}")
         
@@ -355,15 +2068,15 @@ class TikTokScraper:
         # Stats with icons
         print(f"\n{self.colorize('📊 STATISTICS', C.BRIGHT_YELLOW)}")
         print(f"{self.colorize('─'*40, C.CYAN)}")
-        print(f"{self.colorize('👥 Followers:', C.BLUE)} {self.colorize(user_data.get('followers', '0'), C.BRIGHT_WHITE)}")
-        print(f"{self.colorize('🤝 Following:', C.BLUE)} {self.colorize(user_data.get('following', '0'), C.BRIGHT_WHITE)}")
-        print(f"{self.colorize('❤️  Total Likes:', C.BLUE)} {self.colorize(user_data.get('likes', '0'), C.BRIGHT_WHITE)}")
-        print(f"{self.colorize('🎬 Videos:', C.BLUE)} {self.colorize(user_data.get('videos', '0'), C.BRIGHT_WHITE)}")
-        print(f"{self.colorize('👍 Digg Count:', C.BLUE)} {self.colorize(user_data.get('diggCount', '0'), C.BRIGHT_WHITE)}")
-        print(f"{self.colorize('👯 Friends:', C.BLUE)} {self.colorize(user_data.get('friendCount', '0'), C.BRIGHT_WHITE)}")
+        print(f"{self.colorize('👥 Followers:', C.BLUE)} {self.colorize(self._format_number(user_data.get('followers')), C.BRIGHT_WHITE)}")
+        print(f"{self.colorize('🤝 Following:', C.BLUE)} {self.colorize(self._format_number(user_data.get('following')), C.BRIGHT_WHITE)}")
+        print(f"{self.colorize('❤️  Total Likes:', C.BLUE)} {self.colorize(self._format_number(user_data.get('likes')), C.BRIGHT_WHITE)}")
+        print(f"{self.colorize('🎬 Videos:', C.BLUE)} {self.colorize(self._format_number(user_data.get('videos')), C.BRIGHT_WHITE)}")
+        print(f"{self.colorize('👍 Digg Count:', C.BLUE)} {self.colorize(str(user_data.get('diggCount', 'N/A')), C.BRIGHT_WHITE)}")
+        print(f"{self.colorize('👯 Friends:', C.BLUE)} {self.colorize(str(user_data.get('friendCount', 'N/A')), C.BRIGHT_WHITE)}")
         
         # Biography
-        if user_data.get('signature') and user_data['signature'] != 'N/A':
+        if user_data.get('signature'):
             print(f"\n{self.colorize('📝 BIOGRAPHY', C.BRIGHT_YELLOW)}")
             print(f"{self.colorize('─'*40, C.CYAN)}")
             print(f"{self.colorize(user_data.get('signature'), C.WHITE)}")
@@ -380,46 +2093,96 @@ class TikTokScraper:
         print(f"{self.colorize('─'*40, C.CYAN)}")
         print(f"{self.colorize('SecUid:', C.GREEN)} {self.colorize(user_data.get('secUid', 'N/A')[:30] + '...', C.DIM)}")
         print(f"{self.colorize('Region:', C.GREEN)} {self.colorize(user_data.get('region', 'N/A'), C.WHITE)}")
-        if user_data.get('createTime') and user_data['createTime'] != 'N/A':
-            print(f"{self.colorize('Created:', C.GREEN)} {self.colorize(user_data['createTime'], C.WHITE)}")
+        if user_data.get('createTime'):
+            create_date = datetime.fromtimestamp(user_data['createTime']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{self.colorize('Created:', C.GREEN)} {self.colorize(create_date, C.WHITE)}")
         
         # Fetch time
         if 'fetch_time' in user_data:
-            print(f"\n{self.colorize('⏱️  Fetch Time:', C.DIM)} {self.colorize(user_data['fetch_time'], C.DIM)}")
+            fetch_time = f"{user_data['fetch_time']:.2f}s"
+            if user_data.get('source'):
+                fetch_time += f" ({user_data['source']})"
+            print(f"\n{self.colorize('⏱️  Fetch Time:', C.DIM)} {self.colorize(fetch_time, C.DIM)}")
         
         print(f"\n{self.colorize('='*60, C.BRIGHT_CYAN)}")
     
-    def download_profile_pic(self, user_data, directory="profile_pics"):
+    def download_profile_pic(self, user_data, directory="profile_pics", store=None):
         """Download profile picture"""
+        own_store = store is None
+        try:
+            store = store or AvatarStore(directory)
+            print(f"\n{self.colorize('📥 Downloading profile picture...', C.CYAN)}")
+            status, filename = self._download_avatar(user_data, store)
+            if own_store:
+                store.save()
+        except Exception as e:
+            print(f"{self.colorize('❌ Error downloading:', C.RED)} {str(e)}")
+            return None
+        
+        if status == 'unchanged':
+            print(f"{self.colorize('✅ Up to date:', C.BRIGHT_GREEN)} {self.colorize(filename, C.WHITE)}")
+        elif status == 'downloaded':
+            print(f"{self.colorize('✅ Downloaded:', C.BRIGHT_GREEN)} {self.colorize(filename, C.WHITE)}")
+        elif status == 'failed':
+            print(f"{self.colorize('❌ Failed to download', C.RED)}")
+        return filename
+    
+    def _download_avatar(self, user_data, store):
+        """Fetch one avatar into the store; returns (status, filename)"""
         avatar_url = user_data.get('avatarLarger')
-        if avatar_url and avatar_url != 'N/A':
+        if not avatar_url:
+            return 'skipped', None
+        
+        # Clean URL
+        avatar_url = avatar_url.replace('\\u002F', '/')
+        unique_id = user_data.get('unique_id', 'user')
+        
+        if store.is_current(unique_id, avatar_url):
+            return 'unchanged', store.link_path(unique_id)
+        
+        metrics = {}
+        with self._egress(metrics) as proxies:
+            response = self.session.get(avatar_url, stream=True, timeout=10, proxies=proxies)
+            metrics['status'] = response.status_code
             try:
-                # Clean URL
-                avatar_url = avatar_url.replace('\\u002F', '/')
-                
-                # Create directory if it doesn't exist
-                if not os.path.exists(directory):
-                    os.makedirs(directory)
-                
-                # Download
-                print(f"\n{self.colorize('📥 Downloading profile picture...', C.CYAN)}")
-                response = requests.get(avatar_url, stream=True, timeout=10)
-                
-                if response.status_code == 200:
-                    filename = f"{directory}/{user_data.get('unique_id', 'user')}_profile.jpg"
-                    with open(filename, 'wb') as f:
-                        for chunk in response.iter_content(1024):
-                            f.write(chunk)
-                    
-                    print(f"{self.colorize('✅ Downloaded:', C.BRIGHT_GREEN)} {self.colorize(filename, C.WHITE)}")
-                    return filename
-                else:
-                    print(f"{self.colorize('❌ Failed to download', C.RED)}")
-                    
-            except Exception as e:
-                print(f"{self.colorize('❌ Error downloading:', C.RED)} {str(e)}")
+                if response.status_code != 200:
+                    return 'failed', None
+                return 'downloaded', store.store(unique_id, avatar_url, response.iter_content(AVATAR_CHUNK_SIZE))
+            finally:
+                response.close()
+    
+    def download_profile_pics(self, users, directory="profile_pics", concurrency=8, total=None):
+        """Download many avatars in parallel, skipping ones already stored"""
+        store = AvatarStore(directory)
+        self.ensure_pool_size(concurrency)
+        counts = {'downloaded': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
         
-        return None
+        def collect(finished):
+            for future in finished:
+                try:
+                    status, _ = future.result()
+                except Exception:
+                    status = 'failed'
+                counts[status] += 1
+            if total:
+                progress_bar(min(sum(counts.values()), total), total, prefix='Avatars', suffix=f"{counts['downloaded']} new")
+        
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            for user_data in users:
+                if "error" in user_data:
+                    counts['skipped'] += 1
+                    continue
+                pending.add(executor.submit(self._download_avatar, user_data, store))
+                # Keep a bounded number of downloads queued
+                if len(pending) >= concurrency * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            collect(wait(pending)[0])
+        
+        store.save()
+        return counts
     
     def export_to_json(self, user_data, filename=None):
         """Export user data to JSON file"""
@@ -428,13 +2191,1106 @@ class TikTokScraper:
         
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(user_data, f, indent=2, ensure_ascii=False)
+                json.dump(to_jsonable(user_data), f, indent=2, ensure_ascii=False)
             print(f"\n{self.colorize('💾 Data exported to:', C.BRIGHT_GREEN)} {self.colorize(filename, C.WHITE)}")
             return True
         except Exception as e:
             print(f"{self.colorize('❌ Export failed:', C.RED)} {str(e)}")
             return False
 
+# ============================================
+# PARSE STAGE
+# ============================================
+def parse_profile_page(body, encoding='utf-8'):
+    """Decode and extract one page; returns (record, phase timings) and is safe to run in a worker process"""
+    decode_start = time.perf_counter()
+    html_content = body.decode(encoding, errors='replace')
+    extract_start = time.perf_counter()
+    user_data = TikTokScraper._extract_data(html_content)
+    return user_data, {'decode': extract_start - decode_start, 'extract': time.perf_counter() - extract_start}
+
+# ============================================
+# BATCH ENGINE
+# ============================================
+class HostThrottle:
+    """AIMD request rate, backoff and circuit breaker for one host"""
+    def __init__(self, rate, min_rate=0.2, max_rate=math.inf, increase=2.0, decrease=0.75,
+                 window=50, min_samples=20, trip_ratio=0.5, open_seconds=30.0):
+        # Requests per second; math.inf means unpaced until the first throttle
+        self.rate = min(rate, max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.min_samples = min_samples
+        self.trip_ratio = trip_ratio
+        self.base_open_seconds = open_seconds
+        self.open_seconds = open_seconds
+        self.next_slot = 0.0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.streak = 0
+        # Ramp up multiplicatively until the host first pushes back, then AIMD
+        self.slow_start = True
+        self.outcomes = deque(maxlen=window)
+        self.starts = deque(maxlen=window)
+        self.state = 'closed'
+        self.opened_until = 0.0
+        self.probing = False
+        self.trips = 0
+    
+    def reserve(self, now):
+        """Claim a request start at now and return 0, or return seconds to wait before asking again"""
+        if self.state == 'open':
+            if now < self.opened_until:
+                return self.opened_until - now
+            self.state = 'half-open'
+        if self.state == 'half-open':
+            # A single probe decides whether the circuit closes again
+            if self.probing:
+                return 0.5
+            self.probing = True
+        elif now < self.blocked_until:
+            return self.blocked_until - now
+        elif self.rate != math.inf:
+            if now < self.next_slot:
+                return self.next_slot - now
+            self.next_slot = now + 1 / self.rate
+        self.starts.append(now)
+        return 0
+    
+    def observed_rate(self, now):
+        """Recent request starts per second"""
+        if len(self.starts) < 2 or now <= self.starts[0]:
+            return self.max_rate if self.max_rate != math.inf else 10.0
+        return len(self.starts) / (now - self.starts[0])
+    
+    def record(self, outcome, now, retry_after=None):
+        """Feed back one result: 'ok', 'throttled', 'error' (retryable) or 'final'"""
+        failed = outcome in ('throttled', 'error')
+        if self.state == 'half-open' and self.probing:
+            self.probing = False
+            if failed:
+                self._open(now, self.open_seconds * 2)
+            else:
+                self.state = 'closed'
+                self.open_seconds = self.base_open_seconds
+                self.outcomes.clear()
+        
+        self.outcomes.append(failed)
+        if outcome == 'throttled':
+            self.streak += 1
+            # Full jitter, but never earlier than the server asked for
+            backoff = random.uniform(0, min(60.0, 0.25 * 2 ** self.streak))
+            if retry_after is not None:
+                backoff += retry_after
+            self.blocked_until = max(self.blocked_until, now + backoff)
+            # One multiplicative decrease per round of in-flight requests
+            self.slow_start = False
+            if now - self.last_decrease >= 1.0:
+                current = self.rate if self.rate != math.inf else self.observed_rate(now)
+                self.rate = max(self.min_rate, current * self.decrease)
+                self.last_decrease = now
+        elif outcome == 'ok':
+            self.streak = 0
+            if self.rate != math.inf:
+                # Slow start doubles the rate each second; afterwards add about `increase` req/s per second
+                step = 1.0 if self.slow_start else self.increase / self.rate
+                self.rate = min(self.max_rate, self.rate + step)
+        
+        if self.state == 'closed' and len(self.outcomes) >= self.min_samples:
+            if sum(self.outcomes) / len(self.outcomes) >= self.trip_ratio:
+                self._open(now, self.open_seconds)
+    
+    def _open(self, now, seconds):
+        """Stop sending requests for a while"""
+        self.state = 'open'
+        self.open_seconds = min(300.0, seconds)
+        self.opened_until = now + self.open_seconds
+        self.outcomes.clear()
+        self.trips += 1
+
+class AdaptiveThrottle:
+    """Per-host HostThrottle registry for the batch engine's event loop"""
+    def __init__(self, delay=0.25, max_rate=None, **options):
+        self.initial_rate = 1 / delay if delay > 0 else math.inf
+        self.max_rate = max_rate or math.inf
+        self.options = options
+        self.hosts = {}
+    
+    def host(self, host):
+        """Throttle state for a host, created on first use"""
+        if host not in self.hosts:
+            self.hosts[host] = HostThrottle(self.initial_rate, max_rate=self.max_rate, **self.options)
+        return self.hosts[host]
+    
+    async def wait(self, host):
+        """Sleep until the host may take another request"""
+        throttle = self.host(host)
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = throttle.reserve(loop.time())
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+    
+    def record(self, host, outcome, retry_after=None):
+        self.host(host).record(outcome, asyncio.get_running_loop().time(), retry_after)
+
+def classify_result(user_data):
+    """'ok', 'throttled', 'error' (worth retrying) or 'final' for a fetch result"""
+    if "error" not in user_data:
+        return 'ok'
+    metrics = user_data.get('metrics') or {}
+    if metrics.get('throttle'):
+        return 'throttled'
+    if metrics.get('stale_identity'):
+        return 'error'
+    status = metrics.get('status')
+    if status is None or status >= 500:
+        return 'error'
+    return 'final'
+
+class BatchEngine:
+    """Run fetch_user_info over many identifiers with bounded concurrency"""
+    def __init__(self, scraper, concurrency=8, delay=0.25, parse_workers=0, max_rate=None, attempts=4):
+        self.scraper = scraper
+        self.concurrency = max(1, int(concurrency))
+        self.parse_workers = max(0, int(parse_workers))
+        self.attempts = max(1, int(attempts))
+        self.throttle = AdaptiveThrottle(delay, max_rate)
+        # Never run more requests in flight than the pool can keep alive
+        scraper.ensure_pool_size(self.concurrency)
+    
+    async def _fetch_one(self, executor, parse_pool, index, identifier, by_id):
+        """Fetch one user, retrying throttled and transient failures after the host's backoff"""
+        host = urllib.parse.urlsplit(self.scraper.profile_url(identifier, by_id)).netloc
+        throttled = 0
+        for attempt in range(1, self.attempts + 1):
+            await self.throttle.wait(host)
+            user_data = await self._attempt(executor, parse_pool, identifier, by_id)
+            outcome = classify_result(user_data)
+            metrics = user_data.get('metrics')
+            self.throttle.record(host, outcome, metrics.get('retry_after') if metrics else None)
+            throttled += outcome == 'throttled'
+            if outcome in ('ok', 'final'):
+                break
+        
+        if metrics is not None:
+            metrics['attempts'] = attempt
+            metrics['throttled'] = throttled
+        return index, identifier, user_data
+    
+    async def _attempt(self, executor, parse_pool, identifier, by_id):
+        """One fetch on the thread pool, parsed in place or on the process pool"""
+        loop = asyncio.get_running_loop()
+        if parse_pool is None:
+            return await loop.run_in_executor(executor, self.scraper.fetch_user_info, identifier, by_id)
+        
+        # Fetch on a thread, parse in a worker process; the thread moves on to the next download
+        page = await loop.run_in_executor(executor, self.scraper.fetch_page, identifier, by_id)
+        if "error" in page:
+            return page
+        try:
+            parsed = await loop.run_in_executor(parse_pool, parse_profile_page, page.pop('body'), page['encoding'])
+        except Exception as e:
+            parsed = e
+        return self.scraper.finish_page(page, parsed)
+    
+    @staticmethod
+    def _read_ahead(source, loop, queue, slots):
+        """Feed identifiers to the event loop from a daemon thread, one free slot at a time"""
+        try:
+            for item in source:
+                slots.acquire()
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+        except RuntimeError:
+            # Event loop closed: the consumer stopped early
+            pass
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+    
+    async def stream(self, identifiers, by_id=False):
+        """Yield (index, identifier, user_data) in completion order"""
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+        import multiprocessing
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        parse_pool = None
+        if self.parse_workers:
+            # spawn: forking a process that already runs threads is unsafe
+            parse_pool = ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context('spawn'))
+        # Identifiers are pulled lazily on their own thread, so a slow producer (a pipe,
+        # tail -f) never holds back finished results; slots bound the work in flight,
+        # with room for pages queued at the parse stage while fetches continue
+        queue = asyncio.Queue()
+        slots = threading.Semaphore(self.concurrency + 2 * self.parse_workers)
+        threading.Thread(target=self._read_ahead, args=(enumerate(identifiers, 1), loop, queue, slots), daemon=True).start()
+        
+        pending = set()
+        next_item = None
+        exhausted = False
+        try:
+            while True:
+                if next_item is None and not exhausted:
+                    next_item = asyncio.ensure_future(queue.get())
+                waiting = pending | {next_item} if next_item else pending
+                if not waiting:
+                    break
+                
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if next_item in done:
+                    item = next_item.result()
+                    next_item = None
+                    if item is None:
+                        exhausted = True
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        pending.add(asyncio.ensure_future(self._fetch_one(executor, parse_pool, item[0], item[1], by_id)))
+                
+                for task in done & pending:
+                    pending.discard(task)
+                    slots.release()
+                    yield task.result()
+        finally:
+            if next_item:
+                next_item.cancel()
+            for task in pending:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            if parse_pool:
+                parse_pool.shutdown(wait=False, cancel_futures=True)
+    
+    def run(self, identifiers, by_id=False):
+        """Synchronous generator over stream() for non-async callers"""
+        loop = asyncio.new_event_loop()
+        results = self.stream(identifiers, by_id)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            try:
+                loop.run_until_complete(results.aclose())
+            except RuntimeError:
+                # Interrupted mid-step (Ctrl-C): cancelling the suspended step runs the stream's cleanup
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+
+# ============================================
+# BATCH INPUT / OUTPUT
+# ============================================
+def normalize_identifier(identifier, by_id=False):
+    """Canonical form of a username or user ID as requested from TikTok"""
+    identifier = identifier.strip()
+    if by_id:
+        return identifier
+    # Handles are case-insensitive and often pasted with their @
+    return identifier.removeprefix('@').strip().lower()
+
+class BloomFilter:
+    """Fixed-memory set membership with about error_rate false positives at capacity items"""
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, item):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+    
+    def add(self, item):
+        """Add item; returns True if it was (probably) already present"""
+        present = True
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+    
+    def __contains__(self, item):
+        return all(self.bits[position // 8] & (1 << position % 8) for position in self._positions(item))
+
+class IdentifierDedup:
+    """Streaming normalize-and-dedup stage in front of a batch; exact until max_exact, then a Bloom filter"""
+    MODES = ('auto', 'exact', 'bloom', 'off')
+    
+    def __init__(self, by_id=False, mode='auto', max_exact=500000, capacity=20000000, error_rate=0.001):
+        self.by_id = by_id
+        self.mode = mode
+        self.max_exact = {'exact': math.inf, 'bloom': 0}.get(mode, max_exact)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.seen = set()
+        self.bloom = None
+        self.unique = 0
+        self.duplicates = 0
+        self.blank = 0
+    
+    def seen_before(self, identifier):
+        """Record identifier; True if it was already seen this run"""
+        if self.bloom is not None:
+            return self.bloom.add(identifier)
+        if identifier in self.seen:
+            return True
+        self.seen.add(identifier)
+        if len(self.seen) > self.max_exact:
+            # Past this size the exact set costs more than a fixed-size filter
+            self.bloom = BloomFilter(max(self.capacity, 2 * len(self.seen)), self.error_rate)
+            for seen in self.seen:
+                self.bloom.add(seen)
+            self.seen = set()
+        return False
+    
+    def filter(self, identifiers):
+        """Yield each identifier normalized, skipping blanks and repeats"""
+        for identifier in identifiers:
+            identifier = normalize_identifier(identifier, self.by_id)
+            if not identifier:
+                self.blank += 1
+                continue
+            if self.mode != 'off' and self.seen_before(identifier):
+                self.duplicates += 1
+                continue
+            self.unique += 1
+            yield identifier
+    
+    def summary(self):
+        """One-line report of what the stage skipped"""
+        text = f"{self.unique} unique, {self.duplicates} duplicates skipped"
+        if self.bloom is not None:
+            text += f" (Bloom filter, ~{self.error_rate:.1%} may be skipped wrongly)"
+        return text
+
+def iter_identifiers(filename):
+    """Yield stripped, non-blank lines from a file (or stdin for '-') without loading it whole"""
+    if filename == '-':
+        yield from (line.strip() for line in sys.stdin if line.strip())
+        return
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+def count_identifiers(filename):
+    """Count non-blank lines in a file with a streaming pass"""
+    return sum(1 for _ in iter_identifiers(filename))
+
+def iter_user_records(filename):
+    """Yield saved profiles from a batch .ndjson/.jsonl or .json file"""
+    if filename.endswith('.json'):
+        with open(filename, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        for record in (records if isinstance(records, list) else [records]):
+            yield ProfileRecord.from_dict(record)
+        return
+    
+    for line in iter_identifiers(filename):
+        yield ProfileRecord.from_dict(json.loads(line))
+
+class NDJSONSink:
+    """Append one compact JSON line per result (to stdout for '-'), flushing in batches"""
+    def __init__(self, path, flush_every=100, flush_interval=2.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._lines = []
+        self._last_flush = time.monotonic()
+        self._file = sys.stdout if path == '-' else open(path, 'a', encoding='utf-8')
+    
+    def write(self, record):
+        """Queue one record; flush when enough lines or time have accumulated"""
+        self._lines.append(json.dumps(to_jsonable(record), ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.count += 1
+        if len(self._lines) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self):
+        """Write queued lines in one call so readers only ever see whole lines"""
+        if self._lines:
+            self._file.write(''.join(self._lines))
+            self._lines.clear()
+        self._file.flush()
+        self._last_flush = time.monotonic()
+    
+    def close(self):
+        """Flush and close the file"""
+        self.flush()
+        if self._file is not sys.stdout:
+            self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class BatchJournal:
+    """Append-only progress log of done/failed identifiers for one batch input"""
+    DONE = 'D'
+    FAILED = 'F'
+    
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.failed = {}
+        if os.path.exists(path):
+            self._load()
+        self._file = open(path, 'a', encoding='utf-8', buffering=1)
+    
+    @staticmethod
+    def path_for(filename, by_id=False, directory='output/.journal'):
+        """Journal location for an input file, stable across runs"""
+        key = f"{os.path.abspath(filename)}|{'id' if by_id else 'username'}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{os.path.basename(filename)}-{digest}.journal")
+    
+    def _load(self):
+        """Replay the journal, dropping a final line torn by a crash"""
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end != len(data):
+                f.truncate(end)
+        entries = data[:end].decode('utf-8', errors='replace').split('\n')
+        entries.pop()
+        
+        # Finished identifiers are never scraped again, so a done entry
+        # always outranks any failure recorded for the same identifier
+        done_tag, failed_tag = f"{self.DONE}\t", f"{self.FAILED}\t"
+        self.done = {entry[2:] for entry in entries if entry[:2] == done_tag}
+        for entry in entries:
+            if entry[:2] == failed_tag:
+                identifier, _, error = entry[2:].partition('\t')
+                if identifier not in self.done:
+                    self.failed[identifier] = error
+    
+    def record_done(self, identifier):
+        """Mark an identifier as scraped"""
+        self._file.write(f"{self.DONE}\t{identifier}\n")
+        self.done.add(identifier)
+        self.failed.pop(identifier, None)
+    
+    def record_failed(self, identifier, error):
+        """Mark an identifier as failed, keeping the reason"""
+        error = ' '.join(str(error).split())
+        self._file.write(f"{self.FAILED}\t{identifier}\t{error}\n")
+        self.failed[identifier] = error
+    
+    def pending(self, identifiers, retry_failed=True):
+        """Yield identifiers that still need scraping"""
+        for identifier in identifiers:
+            if identifier in self.done:
+                continue
+            if not retry_failed and identifier in self.failed:
+                continue
+            yield identifier
+    
+    def reset(self):
+        """Forget previous progress and start a fresh journal"""
+        self._file.close()
+        self.done.clear()
+        self.failed.clear()
+        self._file = open(self.path, 'w', encoding='utf-8', buffering=1)
+    
+    def close(self):
+        """Close the journal file"""
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+# ============================================
+# WORK QUEUE
+# ============================================
+class WorkQueue(ProfileStore):
+    """Leased task queue shared by worker processes and nodes through one SQLite file; results land in its snapshots"""
+    def __init__(self, path, by_id=False, lease_seconds=300, max_attempts=3, batch_size=100, flush_interval=2.0):
+        # Rollback journal with plain file locks: WAL needs shared memory, which network filesystems lack
+        super().__init__(path, batch_size, journal_mode='DELETE', timeout=120)
+        import socket
+        self.by_id = int(bool(by_id))
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.flush_interval = flush_interval
+        self.worker = f"{socket.gethostname()}:{os.getpid()}:{random.randrange(16 ** 6):06x}"
+        self.completed = 0
+        self.lost = 0
+        self._outcomes = []
+        self._flushed = time.time()
+        self._closed = threading.Event()
+        self._heartbeat = None
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                identifier TEXT NOT NULL,
+                by_id INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                finished_at REAL,
+                UNIQUE (identifier, by_id)
+            );
+            CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, by_id, lease_until);
+        """)
+    
+    def enqueue(self, identifiers, chunk_size=10000):
+        """Add identifiers that are not queued yet; returns how many were new"""
+        added = 0
+        chunk = []
+        for identifier in identifiers:
+            chunk.append((identifier, self.by_id))
+            if len(chunk) >= chunk_size:
+                added += self._insert_tasks(chunk)
+                chunk = []
+        if chunk:
+            added += self._insert_tasks(chunk)
+        return added
+    
+    def _insert_tasks(self, rows):
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO tasks (identifier, by_id) VALUES (?, ?)", rows)
+            return self._db.total_changes - before
+    
+    def claim(self, count):
+        """Lease up to count tasks to this worker; leases left behind by dead workers go first"""
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers never lease the same rows
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._db.execute(
+                    "SELECT id, identifier FROM tasks WHERE state = 'leased' AND by_id = ? AND lease_until < ? LIMIT ?",
+                    (self.by_id, now, count),
+                ).fetchall()
+                if len(rows) < count:
+                    rows += self._db.execute(
+                        "SELECT id, identifier FROM tasks WHERE state = 'pending' AND by_id = ? ORDER BY id LIMIT ?",
+                        (self.by_id, count - len(rows)),
+                    ).fetchall()
+                self._db.executemany(
+                    "UPDATE tasks SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(self.worker, now + self.lease_seconds, task_id) for task_id, _ in rows],
+                )
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        return [identifier for _, identifier in rows]
+    
+    def renew(self):
+        """Extend every lease this worker holds"""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE tasks SET lease_until = ? WHERE state = 'leased' AND worker = ?",
+                (time.time() + self.lease_seconds, self.worker),
+            )
+    
+    def keep_alive(self):
+        """Renew this worker's leases from a daemon thread until close()"""
+        def beat():
+            while not self._closed.wait(self.lease_seconds / 3):
+                try:
+                    self.renew()
+                except sqlite3.Error:
+                    # Locked past the timeout; the next beat still lands well inside the lease
+                    pass
+        self._heartbeat = threading.Thread(target=beat, daemon=True)
+        self._heartbeat.start()
+    
+    def tasks(self, claim_size=50, poll_interval=5.0):
+        """Yield identifiers leased to this worker until no task is pending or leased anywhere"""
+        while not self._closed.is_set():
+            batch = self.claim(claim_size)
+            if batch:
+                yield from batch
+                continue
+            if not self.counts()['leased']:
+                return
+            # Other workers (or this one's own fetches) still hold leases; pick them up if they expire
+            self._closed.wait(poll_interval)
+    
+    def complete(self, identifier, record):
+        """Store the task's result; the snapshot is written in the same transaction that closes the task"""
+        assert record.user_id or record.unique_id, "snapshot without an account identity"
+        self._finish(('done', identifier, self._row(record)))
+    
+    def fail(self, identifier, error, retry=True):
+        """Record a failed attempt; retried tasks go back to the queue until max_attempts"""
+        self._finish(('retry' if retry else 'failed', identifier, error))
+    
+    def _finish(self, outcome):
+        with self._lock:
+            self._outcomes.append(outcome)
+            if len(self._outcomes) >= self.batch_size or time.time() - self._flushed >= self.flush_interval:
+                self._flush()
+    
+    def _flush(self):
+        super()._flush()
+        self._flushed = time.time()
+        if not self._outcomes:
+            return
+        now = time.time()
+        snapshots = []
+        with self._db:
+            for state, identifier, detail in self._outcomes:
+                owned = (identifier, self.by_id, self.worker)
+                # Updates only match while this worker still holds the lease, so a task
+                # that expired and was re-leased is never written twice
+                if state == 'done':
+                    cursor = self._db.execute(
+                        "UPDATE tasks SET state = 'done', lease_until = NULL, error = NULL, finished_at = ?"
+                        " WHERE identifier = ? AND by_id = ? AND worker = ? AND state = 'leased'",
+                        (now,) + owned,
+                    )
+                    if cursor.rowcount:
+                        snapshots.append(detail)
+                elif state == 'retry':
+                    cursor = self._db.execute(
+                        "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                        " worker = NULL, lease_until = NULL, error = ?, finished_at = ?"
+                        " WHERE identifier = ? AND by_id = ? AND worker = ? AND state = 'leased'",
+                        (self.max_attempts, detail, now) + owned,
+                    )
+                else:
+                    cursor = self._db.execute(
+                        "UPDATE tasks SET state = 'failed', lease_until = NULL, error = ?, finished_at = ?"
+                        " WHERE identifier = ? AND by_id = ? AND worker = ? AND state = 'leased'",
+                        (detail, now) + owned,
+                    )
+                self.lost += not cursor.rowcount
+            if snapshots:
+                placeholders = ', '.join('?' * len(self.COLUMNS))
+                self._db.executemany(f"INSERT INTO snapshots ({', '.join(self.COLUMNS)}) VALUES ({placeholders})", snapshots)
+        self.completed += len(snapshots)
+        self._outcomes.clear()
+    
+    def counts(self):
+        """Tasks per state for this queue's identifier kind"""
+        self.flush()
+        with self._lock:
+            counts = dict(self._db.execute(
+                "SELECT state, COUNT(*) FROM tasks WHERE by_id = ? GROUP BY state", (self.by_id,)
+            ).fetchall())
+            expired = self._db.execute(
+                "SELECT COUNT(*) FROM tasks WHERE state = 'leased' AND by_id = ? AND lease_until < ?", (self.by_id, time.time())
+            ).fetchone()[0]
+        counts = {state: counts.get(state, 0) for state in ('pending', 'leased', 'done', 'failed')}
+        counts['expired'] = expired
+        return counts
+    
+    def release(self):
+        """Hand this worker's unfinished leases back without counting the attempt"""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE tasks SET state = 'pending', worker = NULL, lease_until = NULL, attempts = attempts - 1"
+                " WHERE state = 'leased' AND worker = ?",
+                (self.worker,),
+            )
+    
+    def close(self):
+        """Write outstanding results, return unstarted work to the queue and close"""
+        self._closed.set()
+        self.flush()
+        self.release()
+        super().close()
+
+# ============================================
+# REFRESH SCHEDULER
+# ============================================
+@dataclass(slots=True)
+class RefreshState:
+    """Scheduling state of one monitored account"""
+    account: str
+    last_fetch: float = None
+    counts: dict = None
+    velocity: float = None
+    failures: int = 0
+    due: float = 0.0
+    entry: int = 0
+    in_flight: bool = False
+
+class RefreshScheduler:
+    """Re-scrape a fixed set of accounts within a requests-per-hour budget, fastest-changing first"""
+    VELOCITY_FIELDS = ('followers', 'likes', 'videos')
+    # Relative change per hour assumed for accounts that never move, so they still get refreshed
+    VELOCITY_FLOOR = 1e-6
+    
+    def __init__(self, accounts, budget=600, min_interval=300, max_interval=7 * 86400, store=None, smoothing=0.5, clock=time.time):
+        self.budget = max(1.0, float(budget))
+        self.spacing = 3600.0 / self.budget
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.smoothing = smoothing
+        self.clock = clock
+        self.fetches = 0
+        self._cond = threading.Condition()
+        self._heap = []
+        self._entries = 0
+        self._next_slot = 0.0
+        self._states = {}
+        self._total_share = 0.0
+        
+        for account in accounts:
+            account = normalize_identifier(account)
+            if account and account not in self._states:
+                self._states[account] = RefreshState(account)
+                self._total_share += self._share(None)
+        # Stored snapshots give each account its last fetch time and change velocity
+        if store:
+            for state in self._states.values():
+                for point in store.history(state.account)[-8:]:
+                    self._observe(state, point, datetime.fromisoformat(point['timestamp']).timestamp())
+        for state in self._states.values():
+            self._push(state, state.last_fetch + self.interval(state) if state.last_fetch else 0.0)
+    
+    def __len__(self):
+        return len(self._states)
+    
+    def _share(self, velocity):
+        """Refresh share of an account: rate proportional to the square root of its velocity"""
+        return math.sqrt(max(velocity or 0.0, self.VELOCITY_FLOOR))
+    
+    def interval(self, state):
+        """Seconds between fetches of state's account when the whole budget is spread by share"""
+        seconds = self._total_share / (self._share(state.velocity) * self.budget) * 3600
+        return min(self.max_interval, max(self.min_interval, seconds))
+    
+    def _observe(self, state, counts, when):
+        """Fold a snapshot's counters into the account's smoothed velocity"""
+        counts = {key: counts.get(key) for key in self.VELOCITY_FIELDS}
+        if state.counts and state.last_fetch and when > state.last_fetch:
+            change = sum(
+                abs(counts[key] - state.counts[key]) / max(state.counts[key], 1)
+                for key in self.VELOCITY_FIELDS
+                if counts[key] is not None and state.counts.get(key) is not None
+            )
+            rate = change / ((when - state.last_fetch) / 3600)
+            velocity = rate if state.velocity is None else self.smoothing * rate + (1 - self.smoothing) * state.velocity
+            self._total_share += self._share(velocity) - self._share(state.velocity)
+            state.velocity = velocity
+        state.counts = counts
+        state.last_fetch = when
+    
+    def _push(self, state, due):
+        # Older heap entries of the account go stale and are skipped when popped
+        self._entries += 1
+        state.due = due
+        state.entry = self._entries
+        heapq.heappush(self._heap, (due, self._entries, state.account))
+    
+    def _peek(self):
+        """Earliest-due account not already being fetched"""
+        while self._heap:
+            due, entry, account = self._heap[0]
+            if self._states[account].entry == entry and not self._states[account].in_flight:
+                return self._states[account]
+            heapq.heappop(self._heap)
+        return None
+    
+    def identifiers(self, until=None):
+        """Yield accounts as they fall due and the budget allows; stops at until (epoch seconds)"""
+        while True:
+            with self._cond:
+                while True:
+                    now = self.clock()
+                    if until is not None and now >= until:
+                        return
+                    state = self._peek()
+                    if state and max(state.due, self._next_slot) <= now:
+                        break
+                    # Nothing due yet (or every account in flight): sleep until the next due time or result
+                    wake = max(state.due, self._next_slot) if state else now + 60
+                    if until is not None:
+                        wake = min(wake, until)
+                    self._cond.wait(wake - now)
+                heapq.heappop(self._heap)
+                state.in_flight = True
+                self._next_slot = max(self._next_slot, now) + self.spacing
+                self.fetches += 1
+            yield state.account
+    
+    def record(self, account, user_data, now=None):
+        """Reschedule account from a fetch result"""
+        now = self.clock() if now is None else now
+        with self._cond:
+            state = self._states.get(normalize_identifier(account))
+            if state is None:
+                return
+            state.in_flight = False
+            outcome = classify_result(user_data)
+            if outcome == 'ok':
+                state.failures = 0
+                self._observe(state, user_data, now)
+                due = now + self.interval(state)
+            elif outcome == 'final':
+                # Gone or renamed: check back rarely
+                state.failures += 1
+                due = now + self.max_interval
+            else:
+                state.failures += 1
+                due = now + min(self.interval(state), self.min_interval * 2 ** min(state.failures - 1, 6))
+            self._push(state, due)
+            self._cond.notify_all()
+    
+    def upcoming(self, count=10):
+        """(account, due, velocity) of the next accounts in line"""
+        with self._cond:
+            states = sorted((state for state in self._states.values() if not state.in_flight), key=lambda state: state.due)
+        return [(state.account, state.due, state.velocity) for state in states[:count]]
+
+# ============================================
+# SERVICE MODE
+# ============================================
+DEFAULT_SERVE_ADDRESS = '127.0.0.1:8787'
+# HTTP status answered for each lookup outcome
+SERVICE_STATUS = {'ok': 200, 'final': 404, 'throttled': 503, 'error': 502}
+
+class ResultLRU:
+    """Bounded in-memory LRU of recent lookup results, each valid for ttl seconds"""
+    def __init__(self, max_entries=1024, ttl=60.0, clock=time.monotonic):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+    
+    def get(self, key):
+        """Fresh result for key, or None"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self.clock():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+    
+    def put(self, key, value):
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def __len__(self):
+        return len(self._entries)
+
+class ProfileService:
+    """fetch_user_info behind a short-lived LRU; concurrent lookups of one account share a single fetch"""
+    def __init__(self, scraper, cache_size=1024, ttl=60.0, concurrency=8, delay=0.25, max_rate=None, max_wait=10.0):
+        self.scraper = scraper
+        self.results = ResultLRU(cache_size, ttl)
+        self.throttle = HostThrottle(1 / delay if delay > 0 else math.inf, max_rate=max_rate or math.inf)
+        self.upstream = threading.BoundedSemaphore(max(1, concurrency))
+        self.max_wait = max_wait
+        self.metrics = BatchMetrics()
+        self.started = time.time()
+        self.requests = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        scraper.ensure_pool_size(concurrency)
+    
+    def lookup(self, identifier, by_id=False, fresh=False):
+        """(result, how it was served: 'memory', 'coalesced' or 'fetched') for one account"""
+        key = (normalize_identifier(identifier, by_id), by_id)
+        with self._lock:
+            self.requests += 1
+            cached = None if fresh else self.results.get(key)
+            if cached is not None:
+                return cached, 'memory'
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = {'done': threading.Event(), 'result': None}
+            else:
+                self.coalesced += 1
+                self.waiting += 1
+        
+        if not owner:
+            pending['done'].wait()
+            with self._lock:
+                self.waiting -= 1
+            return pending['result'], 'coalesced'
+        
+        result = {"error": "Unexpected error: lookup aborted"}
+        try:
+            result = self._fetch(key[0], by_id)
+        except Exception as e:
+            result = {"error": f"Unexpected error: {str(e)}"}
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                # Retryable failures are not remembered; the next caller tries again
+                if classify_result(result) in ('ok', 'final'):
+                    self.results.put(key, result)
+            pending['result'] = result
+            pending['done'].set()
+        return result, 'fetched'
+    
+    def _fetch(self, identifier, by_id):
+        """One upstream fetch, paced by the host throttle and bounded by the upstream slots"""
+        deadline = time.monotonic() + self.max_wait
+        with self.upstream:
+            while True:
+                with self._lock:
+                    wait = self.throttle.reserve(time.monotonic())
+                if not wait:
+                    break
+                if time.monotonic() + wait > deadline:
+                    # Fail fast rather than hold the caller through a long backoff
+                    return {"error": "Upstream is backing off; try again later",
+                            "metrics": {'throttle': 'backoff', 'retry_after': wait, 'status': None}}
+                time.sleep(wait)
+            
+            with self._lock:
+                self.fetches += 1
+                self.in_flight += 1
+            try:
+                result = self.scraper.fetch_user_info(identifier, by_id)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        
+        metrics = result.get('metrics') or {}
+        with self._lock:
+            self.throttle.record(classify_result(result), time.monotonic(), metrics.get('retry_after'))
+            self.metrics.observe(result)
+        return result
+    
+    def stats(self):
+        """Lookup counters, cache hit rate, in-flight counts and upstream latency"""
+        with self._lock:
+            requests = self.requests
+            return {
+                'uptime_s': round(time.time() - self.started, 1),
+                'requests': requests,
+                'memory_hits': self.results.hits,
+                'coalesced': self.coalesced,
+                'upstream_fetches': self.fetches,
+                'cache_hit_rate': round(self.results.hits / requests, 4) if requests else 0.0,
+                'fetches_saved_rate': round(1 - self.fetches / requests, 4) if requests else 0.0,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'cached': len(self.results),
+                'cache_capacity': self.results.max_entries,
+                'ttl_s': self.results.ttl,
+                'throttle': {
+                    'state': self.throttle.state,
+                    'rate': None if self.throttle.rate == math.inf else round(self.throttle.rate, 2),
+                },
+                'upstream': self.metrics.summary(),
+            }
+    
+    def to_prometheus(self):
+        """Upstream metrics plus service counters in Prometheus text format"""
+        stats = self.stats()
+        with self._lock:
+            text = self.metrics.to_prometheus()
+        lines = [
+            '# HELP tiktok_service_lookups_total Lookups by how they were served.',
+            '# TYPE tiktok_service_lookups_total counter',
+            f'tiktok_service_lookups_total{{served="memory"}} {stats["memory_hits"]}',
+            f'tiktok_service_lookups_total{{served="coalesced"}} {stats["coalesced"]}',
+            f'tiktok_service_lookups_total{{served="fetched"}} {stats["upstream_fetches"]}',
+            '# HELP tiktok_service_in_flight Upstream fetches running now.',
+            '# TYPE tiktok_service_in_flight gauge',
+            f'tiktok_service_in_flight {stats["in_flight"]}',
+            '# HELP tiktok_service_waiting Callers waiting on another caller\'s fetch.',
+            '# TYPE tiktok_service_waiting gauge',
+            f'tiktok_service_waiting {stats["waiting"]}',
+            '# HELP tiktok_service_cached_results Results held in the LRU.',
+            '# TYPE tiktok_service_cached_results gauge',
+            f'tiktok_service_cached_results {stats["cached"]}',
+        ]
+        return text + '\n'.join(lines) + '\n'
+
+def serve(service, address=DEFAULT_SERVE_ADDRESS, quiet=False):
+    """Answer /user/<name>, /id/<id>, /stats and /metrics over local HTTP until interrupted"""
+    import http.server
+    host, _, port = address.rpartition(':')
+    
+    class ServiceHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def log_message(self, format, *args):
+            pass
+        
+        def send_text(self, status, body, content_type, headers=()):
+            body = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def send_json(self, status, payload, headers=()):
+            self.send_text(status, json.dumps(payload, ensure_ascii=False), 'application/json; charset=utf-8', headers)
+        
+        def do_GET(self):
+            parts = urllib.parse.urlsplit(self.path)
+            path = urllib.parse.unquote(parts.path).rstrip('/')
+            if path == '/stats':
+                return self.send_json(200, service.stats())
+            if path == '/metrics':
+                return self.send_text(200, service.to_prometheus(), 'text/plain; version=0.0.4')
+            if path == '/healthz':
+                return self.send_json(200, {'status': 'ok'})
+            
+            kind, _, identifier = path.lstrip('/').partition('/')
+            if kind not in ('user', 'id') or not identifier.strip():
+                return self.send_json(404, {"error": "Unknown endpoint; use /user/<username>, /id/<user id>, /stats or /metrics"})
+            fresh = urllib.parse.parse_qs(parts.query).get('fresh', ['0'])[-1] in ('1', 'true', 'yes')
+            result, served = service.lookup(identifier, kind == 'id', fresh)
+            outcome = classify_result(result)
+            headers = [('X-Cache', served)]
+            retry_after = (result.get('metrics') or {}).get('retry_after')
+            if outcome == 'throttled':
+                headers.append(('Retry-After', str(math.ceil(retry_after or 1))))
+            self.send_json(SERVICE_STATUS[outcome], to_jsonable(result), headers)
+    
+    server = http.server.ThreadingHTTPServer((host or '127.0.0.1', int(port)), ServiceHandler)
+    server.daemon_threads = True
+    if not quiet:
+        bound = f"http://{server.server_address[0]}:{server.server_address[1]}"
+        print(f"{service.scraper.colorize('🛰️  Serving lookups at', C.BRIGHT_GREEN)} {bound}/user/<username>  (stats: {bound}/stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # Releases the session pool and commits the cache and identity index
+        service.scraper.close()
+    return 0
+
 # ============================================
 # MENU FUNCTIONS
 # ============================================
@@ -501,45 +3357,134 @@ def menu_scrape_multiple(scraper):
         return
     
     try:
-        with open(filename, 'r') as f:
-            lines = [line.strip() for line in f if line.strip()]
+        use_ids = input(f"\n{C.YELLOW}Are these User IDs? (y/N): {C.RESET}").strip().lower() == 'y'
         
-        print(f"\n{C.GREEN}Found {len(lines)} users in file{C.RESET}")
+        # One counting pass gives the file size, the duplicates (@Foo, foo is fetched once)
+        # and what a resumed run has left; the batch itself re-reads the file
+        journal = BatchJournal(BatchJournal.path_for(filename, use_ids))
+        dedup = IdentifierDedup(use_ids)
+        left = sum(1 for identifier in dedup.filter(iter_identifiers(filename)) if identifier not in journal.done)
+        total = dedup.unique
         
-        use_ids = input(f"\n{C.YELLOW}Are these User IDs? (y/N): {C.RESET}").strip().lower() == 'y'
+        print(f"\n{C.GREEN}Found {dedup.unique + dedup.duplicates} users in file{C.RESET}")
+        if dedup.duplicates:
+            print(f"{C.GREEN}{dedup.summary()}{C.RESET}")
+        
+        if journal.done or journal.failed:
+            print(f"\n{C.CYAN}Previous run: {len(journal.done)} done, {len(journal.failed)} failed{C.RESET}")
+            if input(f"{C.YELLOW}Resume and retry failures? (Y/n): {C.RESET}").strip().lower() == 'n':
+                journal.reset()
+            else:
+                total = left
+                print(f"{C.GREEN}{total} users left to scrape{C.RESET}")
+        
+        concurrency = input(f"{C.YELLOW}Concurrent requests [8]: {C.RESET}").strip()
+        concurrency = int(concurrency) if concurrency.isdigit() else 8
+        save_each = input(f"{C.YELLOW}Also save one JSON file per user? (y/N): {C.RESET}").strip().lower() == 'y'
+        use_db = input(f"{C.YELLOW}Record snapshots in {DEFAULT_DB_PATH}? (y/N): {C.RESET}").strip().lower() == 'y'
+        show_profiles = input(f"{C.YELLOW}Print every full profile as it arrives? (y/N): {C.RESET}").strip().lower() == 'y'
         
-        all_data = []
+        engine = BatchEngine(scraper, concurrency=concurrency)
+        store = ProfileStore() if use_db else None
+        metrics = BatchMetrics()
         successful = 0
         
-        for i, identifier in enumerate(lines, 1):
-            print(f"\n{C.CYAN}[{i}/{len(lines)}]{C.RESET} Processing: {C.WHITE}{identifier}{C.RESET}")
-            
-            user_data = scraper.fetch_user_info(identifier, use_ids)
-            
-            if "error" not in user_data:
-                successful += 1
-                scraper.display_user_info(user_data)
-                all_data.append(user_data)
-                
-                # Save individual JSON
-                json_file = f"output/{user_data.get('unique_id', f'user_{i}')}.json"
-                os.makedirs('output', exist_ok=True)
-                with open(json_file, 'w') as f:
-                    json.dump(user_data, f, indent=2)
+        # Results are appended as they complete, so the file is usable mid-run
+        os.makedirs('output', exist_ok=True)
+        combined_file = f"output/batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+        metrics_file = combined_file.replace('.ndjson', '.metrics.json')
+        print(f"{C.GREEN}📁 Streaming results to: {combined_file}{C.RESET}\n")
+        dashboard = None if show_profiles else BatchDashboard(total, scraper.use_colors)
+        quiet = scraper.quiet
+        scraper.quiet = quiet or bool(dashboard)
+        
+        try:
+            with journal, NDJSONSink(combined_file) as sink:
+                identifiers = journal.pending(IdentifierDedup(use_ids).filter(iter_identifiers(filename)))
+                for done, (i, identifier, user_data) in enumerate(engine.run(identifiers, use_ids), 1):
+                    metrics.observe(user_data)
+                    if dashboard:
+                        dashboard.update(identifier, user_data)
+                    else:
+                        print(f"\n{C.CYAN}[{done}/{total}]{C.RESET} Processed: {C.WHITE}{identifier}{C.RESET}")
+                    
+                    if "error" not in user_data:
+                        successful += 1
+                        if not dashboard:
+                            scraper.display_user_info(user_data)
+                        sink.write(user_data)
+                        if store:
+                            store.add(user_data)
+                        journal.record_done(identifier)
+                        
+                        # Save individual JSON
+                        if save_each:
+                            json_file = f"output/{user_data.get('unique_id', f'user_{i}')}.json"
+                            with open(json_file, 'w') as f:
+                                json.dump(to_jsonable(user_data), f, indent=2)
+                    else:
+                        if not dashboard:
+                            print(f"{C.RED}❌ Failed: {user_data.get('error', 'Unknown error')}{C.RESET}")
+                        journal.record_failed(identifier, user_data.get('error', 'Unknown error'))
+        finally:
+            scraper.quiet = quiet
+            if dashboard:
+                dashboard.close()
+            if store:
+                store.close()
+            metrics.write(metrics_file)
+        
+        print(f"\n{C.BRIGHT_GREEN}✅ Successfully scraped {successful}/{total} users{C.RESET}")
+        print(f"{C.GREEN}📁 Combined data saved to: {combined_file}{C.RESET}")
+        print(f"{C.CYAN}⏱️  Mean per phase: {metrics.summary_line()}{C.RESET}")
+        print(f"{C.GREEN}📈 Metrics saved to: {metrics_file}{C.RESET}")
+        
+        # Full profiles on request, read back from the batch file
+        while dashboard and successful:
+            wanted = input(f"\n{C.YELLOW}View a profile (username, Enter to finish): {C.RESET}").strip().lstrip('@').lower()
+            if not wanted:
+                break
+            record = next((r for r in iter_user_records(combined_file) if (r.unique_id or '').lower() == wanted), None)
+            if record:
+                scraper.display_user_info(record)
             else:
-                print(f"{C.RED}❌ Failed: {user_data.get('error', 'Unknown error')}{C.RESET}")
-            
-            # Small delay to avoid rate limiting
-            time.sleep(1)
-        
-        # Save combined data
-        if all_data:
-            combined_file = f"output/batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(combined_file, 'w') as f:
-                json.dump(all_data, f, indent=2)
-            
-            print(f"\n{C.BRIGHT_GREEN}✅ Successfully scraped {successful}/{len(lines)} users{C.RESET}")
-            print(f"{C.GREEN}📁 Combined data saved to: {combined_file}{C.RESET}")
+                print(f"{C.RED}❌ @{wanted} is not in this batch{C.RESET}")
+    
+    except Exception as e:
+        print(f"{C.RED}❌ Error: {str(e)}{C.RESET}")
+    
+    input(f"\n{C.DIM}Press Enter to continue...{C.RESET}")
+
+def menu_download_avatars(scraper):
+    """Menu for batch downloading profile pictures"""
+    print_header()
+    print(f"{C.BRIGHT_YELLOW}BATCH DOWNLOAD PROFILE PICTURES{C.RESET}\n")
+    
+    filename = input(f"{C.YELLOW}Enter batch results (.ndjson/.json) or usernames/IDs file: {C.RESET}").strip()
+    
+    if not os.path.exists(filename):
+        print(f"{C.RED}❌ File not found!{C.RESET}")
+        input(f"\n{C.DIM}Press Enter to continue...{C.RESET}")
+        return
+    
+    try:
+        if filename.endswith(('.ndjson', '.jsonl', '.json')):
+            # Saved results already carry avatar URLs; no profile fetch needed
+            total = None if filename.endswith('.json') else count_identifiers(filename)
+            users = iter_user_records(filename)
+        else:
+            use_ids = input(f"\n{C.YELLOW}Are these User IDs? (y/N): {C.RESET}").strip().lower() == 'y'
+            total = sum(1 for _ in IdentifierDedup(use_ids).filter(iter_identifiers(filename)))
+            engine = BatchEngine(scraper)
+            users = (user_data for _, _, user_data in engine.run(IdentifierDedup(use_ids).filter(iter_identifiers(filename)), use_ids))
+        
+        concurrency = input(f"{C.YELLOW}Concurrent downloads [8]: {C.RESET}").strip()
+        concurrency = int(concurrency) if concurrency.isdigit() else 8
+        
+        counts = scraper.download_profile_pics(users, concurrency=concurrency, total=total)
+        
+        print(f"\n{C.BRIGHT_GREEN}✅ Downloaded {counts['downloaded']} new pictures{C.RESET}")
+        print(f"{C.GREEN}   Unchanged: {counts['unchanged']} | Skipped: {counts['skipped']} | Failed: {counts['failed']}{C.RESET}")
     
     except Exception as e:
         print(f"{C.RED}❌ Error: {str(e)}{C.RESET}")
@@ -554,6 +3499,10 @@ def menu_settings(scraper):
     print(f"{C.CYAN}Current Settings:{C.RESET}")
     print(f"  Colors: {C.GREEN if scraper.use_colors else C.RED}{'Enabled' if scraper.use_colors else 'Disabled'}{C.RESET}")
     print(f"  Timeout: 15 seconds")
+    print(f"  Connection Pool: {scraper.pool_size} per host")
+    print(f"  Response Cache: {C.GREEN + scraper.cache.path if scraper.cache else C.RED + 'Disabled'}{C.RESET}")
+    print(f"  Proxies: {C.GREEN + f'{scraper.proxies.healthy()}/{len(scraper.proxies)} healthy' if scraper.proxies else C.RED + 'Disabled'}{C.RESET}")
+    print(f"  Identity Index: {C.GREEN + scraper.identity.path if scraper.identity else C.RED + 'Disabled'}{C.RESET}")
     print(f"  User Agent: Chrome 120")
     print()
     
@@ -561,9 +3510,11 @@ def menu_settings(scraper):
     print(f"  {C.GREEN}1{C.RESET} - Toggle Colors")
     print(f"  {C.GREEN}2{C.RESET} - Change Theme")
     print(f"  {C.GREEN}3{C.RESET} - Reset to Defaults")
+    print(f"  {C.GREEN}4{C.RESET} - Toggle Response Cache")
+    print(f"  {C.GREEN}5{C.RESET} - Load Proxy List")
     print(f"  {C.GREEN}0{C.RESET} - Back")
     
-    choice = input(f"\n{C.YELLOW}Choice [0-3]: {C.RESET}").strip()
+    choice = input(f"\n{C.YELLOW}Choice [0-5]: {C.RESET}").strip()
     
     if choice == '1':
         scraper.use_colors = not scraper.use_colors
@@ -572,51 +3523,77 @@ def menu_settings(scraper):
         print(f"\n{C.YELLOW}Theme selection coming soon!{C.RESET}")
     elif choice == '3':
         scraper.use_colors = True
+        if scraper.cache:
+            scraper.cache.close()
+            scraper.cache = None
+        scraper.proxies = None
         print(f"\n{C.GREEN}✅ Settings reset to defaults{C.RESET}")
+    elif choice == '4':
+        if scraper.cache:
+            scraper.cache.close()
+            scraper.cache = None
+        else:
+            scraper.cache = ResponseCache()
+        print(f"\n{C.GREEN}✅ Response cache {'enabled' if scraper.cache else 'disabled'}{C.RESET}")
+    elif choice == '5':
+        filename = input(f"{C.YELLOW}Proxy list file, one URL per line (Enter to disable): {C.RESET}").strip()
+        if not filename:
+            scraper.proxies = None
+            print(f"\n{C.GREEN}✅ Proxies disabled{C.RESET}")
+        elif not os.path.exists(filename):
+            print(f"{C.RED}❌ File not found!{C.RESET}")
+        else:
+            try:
+                scraper.proxies = ProxyPool(ProxyPool.read_list(filename))
+                print(f"\n{C.GREEN}✅ Loaded {len(scraper.proxies)} proxies{C.RESET}")
+            except ValueError as e:
+                print(f"{C.RED}❌ {e}{C.RESET}")
     
     input(f"\n{C.DIM}Press Enter to continue...{C.RESET}")
 
 def main_menu():
     """Main interactive menu"""
-    scraper = TikTokScraper(use_colors=True)
+    scraper = TikTokScraper(use_colors=True, identity=IdentityIndex())
     
-    while True:
-        print_header()
-        print_banner()
-        print_menu()
-        
-        choice = input(f"\n{C.YELLOW}{C.BOLD}Select option [0-6]: {C.RESET}").strip()
-        
-        if choice == '1':
-            menu_scrape_single(scraper)
-        elif choice == '2':
-            # Direct to scrape by ID
+    try:
+        while True:
             print_header()
-            identifier = input(f"\n{C.YELLOW}Enter User ID: {C.RESET}").strip()
-            if identifier:
-                user_data = scraper.fetch_user_info(identifier, by_id=True)
-                scraper.display_user_info(user_data)
-                if "error" not in user_data:
-                    scraper.download_profile_pic(user_data)
+            print_banner()
+            print_menu()
+            
+            choice = input(f"\n{C.YELLOW}{C.BOLD}Select option [0-6]: {C.RESET}").strip()
+            
+            if choice == '1':
+                menu_scrape_single(scraper)
+            elif choice == '2':
+                # Direct to scrape by ID
+                print_header()
+                identifier = input(f"\n{C.YELLOW}Enter User ID: {C.RESET}").strip()
+                if identifier:
+                    user_data = scraper.fetch_user_info(identifier, by_id=True)
+                    scraper.display_user_info(user_data)
+                    if "error" not in user_data:
+                        scraper.download_profile_pic(user_data)
+                    input(f"\n{C.DIM}Press Enter to continue...{C.RESET}")
+            elif choice == '3':
+                menu_scrape_multiple(scraper)
+            elif choice == '4':
+                menu_download_avatars(scraper)
+            elif choice == '5':
+                print_header()
+                print(f"{C.YELLOW}Export feature coming soon!{C.RESET}")
                 input(f"\n{C.DIM}Press Enter to continue...{C.RESET}")
-        elif choice == '3':
-            menu_scrape_multiple(scraper)
-        elif choice == '4':
-            print_header()
-            print(f"{C.YELLOW}Batch download coming soon!{C.RESET}")
-            input(f"\n{C.DIM}Press Enter to continue...{C.RESET}")
-        elif choice == '5':
-            print_header()
-            print(f"{C.YELLOW}Export feature coming soon!{C.RESET}")
-            input(f"\n{C.DIM}Press Enter to continue...{C.RESET}")
-        elif choice == '6':
-            menu_settings(scraper)
-        elif choice == '0':
-            print(f"\n{C.BRIGHT_GREEN}👋 Thank you for using TikTok Scraper!{C.RESET}\n")
-            break
-        else:
-            print(f"\n{C.RED}❌ Invalid choice! Please try again.{C.RESET}")
-            time.sleep(1)
+            elif choice == '6':
+                menu_settings(scraper)
+            elif choice == '0':
+                print(f"\n{C.BRIGHT_GREEN}👋 Thank you for using TikTok Scraper!{C.RESET}\n")
+                break
+            else:
+                print(f"\n{C.RED}❌ Invalid choice! Please try again.{C.RESET}")
+                time.sleep(1)
+    finally:
+        # Commits the identity index writes still batched in memory
+        scraper.close()
 
 # ============================================
 # COMMAND LINE INTERFACE
@@ -633,28 +3610,339 @@ Examples:
   %(prog)s --by-id 123456789
   %(prog)s @username --download
   %(prog)s @username --json
+  %(prog)s --batch users.txt --concurrency 16 --output results.ndjson
+  cat users.txt | %(prog)s --pipe --concurrency 16 > results.ndjson
+  %(prog)s --batch users.txt --cache --cache-ttl 86400
+  %(prog)s --batch users.txt --db profiles.db
+  %(prog)s --db profiles.db --history @username --since 7
+  %(prog)s --aliases 6812345678901234567
+  %(prog)s --serve 127.0.0.1:8787 --serve-ttl 60   (then GET /user/<name>, /id/<id>, /stats)
+  %(prog)s username --videos --video-limit 200 > posts.ndjson
+  %(prog)s --refresh watchlist.txt --budget 600 --db profiles.db
+  %(prog)s --batch users.txt --proxy-file proxies.txt --proxy-concurrency 4
+  %(prog)s --queue /shared/jobs.db --enqueue users.txt
+  %(prog)s --queue /shared/jobs.db --work --concurrency 16   (on every node)
         """
     )
-    parser.add_argument("identifier", help="TikTok username (with or without @) or user ID")
+    parser.add_argument("identifier", nargs="?", help="TikTok username (with or without @) or user ID")
     parser.add_argument("--by-id", action="store_true", help="Indicates if the provided identifier is a user ID")
     parser.add_argument("--download", action="store_true", help="Download profile picture")
     parser.add_argument("--json", action="store_true", help="Output in JSON format")
     parser.add_argument("--no-color", action="store_true", help="Disable colored output")
+    parser.add_argument("--batch", metavar="FILE", help="Scrape every username/ID in FILE (one per line, - for stdin)")
+    parser.add_argument("--show-profiles", action="store_true", help="In --batch mode print every full profile instead of the live dashboard")
+    parser.add_argument("--pipe", action="store_true", help="Non-interactive pipeline mode: read --batch FILE or stdin, write one JSON line per result to stdout")
+    parser.add_argument("--refresh", metavar="FILE", help="Keep re-scraping the accounts in FILE, fastest-changing first, within --budget (snapshots go to --db)")
+    parser.add_argument("--budget", type=float, default=600, help="Requests per hour spent by --refresh (default: 600)")
+    parser.add_argument("--min-interval", type=float, default=5, help="Minutes before --refresh fetches the same account again (default: 5)")
+    parser.add_argument("--duration", type=float, metavar="HOURS", help="Stop --refresh after HOURS (default: run until interrupted)")
+    parser.add_argument("--videos", action="store_true", help="Stream the account's posts as one compact JSON line per video (to --output FILE or stdout)")
+    parser.add_argument("--video-limit", type=int, default=0, metavar="N", help="Stop after N videos (default: all)")
+    parser.add_argument("--serve", nargs="?", const=DEFAULT_SERVE_ADDRESS, metavar="[HOST:]PORT", help=f"Run a local HTTP/JSON lookup service (default: {DEFAULT_SERVE_ADDRESS})")
+    parser.add_argument("--serve-cache", type=int, default=1024, help="Results kept in the service's in-memory LRU (default: 1024)")
+    parser.add_argument("--serve-ttl", type=float, default=60, help="Seconds a result is served from memory (default: 60)")
+    parser.add_argument("--queue", metavar="PATH", help="Shared SQLite work queue for multi-node runs; results are stored in the same file")
+    parser.add_argument("--enqueue", metavar="FILE", help="Add the usernames/IDs in FILE (- for stdin) to --queue")
+    parser.add_argument("--work", action="store_true", help="Lease identifiers from --queue and scrape them until the queue is drained")
+    parser.add_argument("--lease", type=float, default=300, help="Seconds a worker holds a leased identifier before others may take it over (default: 300)")
+    parser.add_argument("--queue-status", action="store_true", help="Print the task counts of --queue and exit")
+    parser.add_argument("--dedup", choices=IdentifierDedup.MODES, default="auto", help="Skip repeated identifiers: exact set, Bloom filter, exact switching to Bloom for huge inputs (auto), or off (default: auto)")
+    parser.add_argument("--resume", action="store_true", help="Skip users a previous --batch run over the same file already scraped")
+    parser.add_argument("--output", metavar="FILE", help="Append each successful result to FILE as one JSON line")
+    parser.add_argument("--concurrency", "--fetch-workers", dest="concurrency", type=int, default=8, help="Concurrent requests in batch mode (default: 8)")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Parse pages in this many worker processes instead of on the fetch threads (default: 0)")
+    parser.add_argument("--pool-size", type=int, default=10, help="Keep-alive connections kept open per host (default: 10)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries for connection errors and 5xx responses (default: 3)")
+    parser.add_argument("--no-stream", action="store_true", help=f"Download whole profile pages instead of stopping once the user data is received. Streaming skips the page tail, but a tail over {STREAM_DRAIN_LIMIT // 1024} KB closes the connection and the next fetch pays a new TCP/TLS handshake (counted as pool_drops in --metrics)")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, metavar="PATH", help=f"Reuse profile pages from an on-disk cache (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--cache-ttl", type=int, default=3600, help="Seconds before a cached page is revalidated (default: 3600)")
+    parser.add_argument("--cache-size", type=int, default=256, help="Cache size limit in MB (default: 256)")
+    parser.add_argument("--delay", type=float, default=0.25, help="Starting seconds between requests to the same host; adapts to throttling (default: 0.25)")
+    parser.add_argument("--max-rate", type=float, help="Never exceed this many requests per second per host")
+    parser.add_argument("--attempts", type=int, default=4, help="Tries per profile when throttled or on transient errors (default: 4; --refresh always makes one, rescheduling failures instead)")
+    parser.add_argument("--proxy", action="append", metavar="URL", help="Send requests through this HTTP or SOCKS proxy (repeatable), e.g. socks5h://10.0.0.2:1080")
+    parser.add_argument("--proxy-file", metavar="FILE", help="Add the proxies listed in FILE, one URL per line")
+    parser.add_argument("--proxy-concurrency", type=int, default=4, help="Requests in flight per proxy (default: 4)")
+    parser.add_argument("--proxy-cooldown", type=float, default=0.0, help="Minimum seconds between requests through one proxy (default: 0)")
+    parser.add_argument("--base-url", default="https://www.tiktok.com", help="Site to scrape, e.g. a local stub server (default: https://www.tiktok.com)")
+    parser.add_argument("--db", nargs="?", const=DEFAULT_DB_PATH, metavar="PATH", help=f"Record every result as a snapshot in a SQLite database (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--latest", nargs="?", const="", metavar="ACCOUNT", help="Print the latest stored snapshot of ACCOUNT (or of every account) and exit")
+    parser.add_argument("--history", metavar="ACCOUNT", help="Print the stored counter history of ACCOUNT and exit")
+    parser.add_argument("--since", type=float, metavar="DAYS", help="Limit --history to the last DAYS days")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, metavar="PATH", help=f"Identity index mapping user IDs, secUids and past handles to current handles (default: {DEFAULT_INDEX_PATH})")
+    parser.add_argument("--no-index", action="store_true", help="Neither consult nor update the identity index")
+    parser.add_argument("--aliases", metavar="ACCOUNT", help="Print the IDs, current handle and past handles known for ACCOUNT and exit")
+    parser.add_argument("--relink", action="store_true", help="Re-extract social links from the bios of every stored snapshot and exit")
+    parser.add_argument("--metrics", metavar="FILE", help="Write latency/transfer metrics to FILE (.prom for Prometheus textfile format, else JSON)")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between --metrics rewrites during a batch (default: 10)")
     
     args = parser.parse_args()
     
-    scraper = TikTokScraper(use_colors=not args.no_color)
+    if args.latest is not None or args.history or args.relink:
+        return query_store(args)
+    if args.aliases:
+        return query_identity(args)
     
-    user_data = scraper.fetch_user_info(args.identifier, args.by_id)
+    if (args.enqueue or args.work or args.queue_status) and not args.queue:
+        parser.error("--enqueue, --work and --queue-status need --queue PATH")
+    queue = None
+    if args.queue:
+        queue = WorkQueue(args.queue, args.by_id, args.lease)
+        if args.enqueue:
+            dedup = IdentifierDedup(args.by_id, args.dedup)
+            added = queue.enqueue(dedup.filter(iter_identifiers(args.enqueue)))
+            print(f"Queued {added} new identifiers ({dedup.unique - added} already queued, {dedup.duplicates} duplicates skipped)",
+                  file=sys.stderr if args.pipe or args.json else sys.stdout)
+        if args.queue_status:
+            counts = queue.counts()
+            print(json.dumps(counts) if args.json else '  '.join(f"{state}: {count}" for state, count in counts.items()))
+        if not args.work:
+            queue.close()
+            return 0
     
-    if args.json:
-        print(json.dumps(user_data, indent=2))
+    if not args.identifier and not args.batch and not args.pipe and not args.refresh and not queue and not args.serve:
+        parser.error("an identifier, --batch FILE, --refresh FILE, --serve or --queue PATH --work is required")
+    if args.pipe and args.identifier:
+        parser.error("--pipe reads identifiers from --batch FILE or stdin, not the command line")
+    if args.videos and not args.identifier:
+        parser.error("--videos needs an identifier")
+    
+    proxies = None
+    if args.proxy or args.proxy_file:
+        specs = list(args.proxy or []) + (ProxyPool.read_list(args.proxy_file) if args.proxy_file else [])
+        try:
+            proxies = ProxyPool(specs, args.proxy_concurrency, args.proxy_cooldown)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    cache = ResponseCache(args.cache, args.cache_ttl, args.cache_size * 1024 * 1024) if args.cache else None
+    scraper = TikTokScraper(
+        use_colors=not (args.no_color or args.pipe),
+        pool_size=args.pool_size,
+        retries=args.retries,
+        stream=not args.no_stream,
+        cache=cache,
+        base_url=args.base_url,
+        quiet=args.json or args.pipe or args.videos or bool(args.serve) or bool((args.batch or args.refresh or queue) and not args.show_profiles),
+        proxies=proxies,
+        identity=None if args.no_index else IdentityIndex(args.index),
+    )
+    
+    if args.videos:
+        return list_videos(scraper, args.identifier, args.by_id, args.video_limit, args.output)
+    if args.serve:
+        service = ProfileService(scraper, args.serve_cache, args.serve_ttl, args.concurrency, args.delay, args.max_rate)
+        return serve(service, args.serve)
+    
+    # Refresh runs always keep history: it is what the scheduler learns velocities from
+    store = ProfileStore(args.db or DEFAULT_DB_PATH) if args.db or args.refresh else None
+    journal = None
+    scheduler = None
+    dedup = None
+    # Batches show a compact live dashboard unless full profiles were asked for
+    dashboard = None
+    if (args.batch or args.refresh or queue) and not (args.pipe or args.json or args.show_profiles):
+        # A raw line count is cheap and needs no dedup set; it is an upper bound until the input runs out
+        total = count_identifiers(args.batch) if args.batch and args.batch != '-' else None
+        dashboard = BatchDashboard(total, scraper.use_colors)
+    if queue:
+        # Leases are renewed in the background while this worker is alive
+        queue.keep_alive()
+        engine = BatchEngine(scraper, args.concurrency, args.delay, args.parse_workers, args.max_rate, args.attempts)
+        results = engine.run(queue.tasks(claim_size=max(16, 2 * args.concurrency)), args.by_id)
+    elif args.refresh:
+        scheduler = RefreshScheduler(iter_identifiers(args.refresh), args.budget, args.min_interval * 60, store=store)
+        until = time.time() + args.duration * 3600 if args.duration else None
+        # One request per budget slot: the scheduler already backs off and reschedules failed accounts
+        engine = BatchEngine(scraper, args.concurrency, args.delay, args.parse_workers, args.max_rate, attempts=1)
+        results = engine.run(scheduler.identifiers(until), args.by_id)
+    elif args.batch or args.pipe:
+        source = args.batch or '-'
+        dedup = IdentifierDedup(args.by_id, args.dedup)
+        identifiers = dedup.filter(iter_identifiers(source))
+        # Only a real file can be resumed
+        if source != '-':
+            journal = BatchJournal(BatchJournal.path_for(source, args.by_id))
+            if not args.resume:
+                journal.reset()
+            identifiers = journal.pending(identifiers)
+            if dashboard and dashboard.total:
+                dashboard.total = max(0, dashboard.total - len(journal.done))
+        if dashboard:
+            identifiers = dashboard.track(identifiers)
+        engine = BatchEngine(scraper, args.concurrency, args.delay, args.parse_workers, args.max_rate, args.attempts)
+        results = engine.run(identifiers, args.by_id)
     else:
-        scraper.display_user_info(user_data)
+        results = [(1, args.identifier, scraper.fetch_user_info(args.identifier, args.by_id))]
+    
+    sink = NDJSONSink(args.output) if args.output else None
+    # Line-at-a-time so results reach the next stage even when input trickles in
+    pipe = NDJSONSink('-', flush_every=1) if args.pipe else None
+    metrics = BatchMetrics() if args.metrics else None
+    metrics_written = time.time()
+    status = 0
+    # Avatars are fetched quietly when stdout carries NDJSON or the dashboard
+    avatars = AvatarStore("profile_pics") if args.download and (pipe or dashboard) else None
+    
+    try:
+        for _, identifier, user_data in results:
+            if metrics:
+                metrics.observe(user_data)
+                if time.time() - metrics_written >= args.metrics_interval:
+                    metrics.write(args.metrics)
+                    metrics_written = time.time()
+            
+            if scheduler:
+                scheduler.record(identifier, user_data)
+            if queue:
+                if "error" in user_data:
+                    queue.fail(identifier, user_data['error'], retry=classify_result(user_data) != 'final')
+                else:
+                    queue.complete(identifier, user_data)
+            if journal:
+                if "error" in user_data:
+                    journal.record_failed(identifier, user_data['error'])
+                else:
+                    journal.record_done(identifier)
+            
+            if sink and "error" not in user_data:
+                sink.write(user_data)
+            if store and "error" not in user_data:
+                store.add(user_data)
+            
+            if pipe:
+                # Failures stay in the stream so downstream can see which inputs were lost
+                pipe.write(user_data if "error" not in user_data else {"input": identifier, **user_data})
+                if avatars and "error" not in user_data:
+                    scraper._download_avatar(user_data, avatars)
+                continue
+            
+            if args.json:
+                print(json.dumps(to_jsonable(user_data), indent=2))
+            elif dashboard:
+                dashboard.update(identifier, user_data)
+                if avatars and "error" not in user_data:
+                    scraper._download_avatar(user_data, avatars)
+                continue
+            else:
+                scraper.display_user_info(user_data)
+            
+            if args.download and "error" not in user_data:
+                scraper.download_profile_pic(user_data)
+    except BrokenPipeError:
+        # Downstream stopped reading (e.g. `| head`); discard the rest of the output
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        status = 1
+    except KeyboardInterrupt:
+        # Refresh runs end this way; keep what was scraped so far
+        status = 130
     
-    if args.download and "error" not in user_data:
-        scraper.download_profile_pic(user_data)
+    if dashboard:
+        dashboard.close()
+    if pipe:
+        pipe.close()
+    if avatars:
+        avatars.save()
+    if sink:
+        sink.close()
+    if store:
+        store.close()
+    if journal:
+        journal.close()
+    if queue:
+        queue.close()
+        if not (pipe or args.json):
+            print(f"{scraper.colorize('📦 Queue:', C.CYAN)} stored {queue.completed} results"
+                  + (f", {queue.lost} came back after their lease had passed to another worker" if queue.lost else ''))
+    if metrics:
+        metrics.write(args.metrics)
+    if dedup and dedup.duplicates:
+        # Keep stdout clean when it carries JSON
+        if pipe or args.json:
+            print(f"Input: {dedup.summary()}", file=sys.stderr)
+        else:
+            print(f"{scraper.colorize('🧹 Input:', C.CYAN)} {dedup.summary()}")
+    if proxies and (args.batch or args.refresh) and not (pipe or args.json):
+        for proxy in proxies.stats():
+            latency = f"{proxy['latency_ms']:.0f}ms" if proxy['latency_ms'] is not None else 'N/A'
+            print(f"{scraper.colorize('🛰️  Proxy', C.CYAN)} {proxy['url']}: {proxy['requests']} requests, "
+                  f"{proxy['failures']} failed, {latency}, ejected {proxy['ejections']}x")
+    scraper.close()
+    return status
+
+def query_store(args):
+    """Answer --latest/--history/--relink from the snapshot database"""
+    scraper = TikTokScraper(use_colors=not args.no_color)
+    with ProfileStore(args.db or DEFAULT_DB_PATH) as store:
+        if args.relink:
+            start = time.time()
+            scanned, updated = store.relink()
+            print(f"{scraper.colorize('🔗 Re-linked', C.GREEN)} {updated} of {scanned} snapshots in {time.time() - start:.2f}s")
+        elif args.history:
+            since = time.time() - args.since * 86400 if args.since else None
+            series = store.history(args.history, since)
+            if args.json:
+                print(json.dumps(series, indent=2))
+            elif not series:
+                print(f"{scraper.colorize('No snapshots stored for', C.YELLOW)} {args.history}")
+            else:
+                print(scraper.colorize(f"{'Timestamp':<20} {'Followers':>12} {'Following':>10} {'Likes':>14} {'Videos':>8}", C.BRIGHT_YELLOW))
+                for point in series:
+                    counts = [point[key] if point[key] is not None else 'N/A' for key in ('followers', 'following', 'likes', 'videos')]
+                    print(f"{point['timestamp'][:19]:<20} {counts[0]:>12} {counts[1]:>10} {counts[2]:>14} {counts[3]:>8}")
+        else:
+            records = store.latest(args.latest or None)
+            for record in records:
+                if args.json:
+                    print(json.dumps(record.to_dict(), ensure_ascii=False))
+                else:
+                    scraper.display_user_info(record)
     
+    scraper.close()
+    return 0
+
+def list_videos(scraper, identifier, by_id=False, limit=0, output=None):
+    """Answer --videos: stream an account's posts as NDJSON, reporting a failure on stderr"""
+    sink = NDJSONSink(output or '-', flush_every=VIDEO_PAGE_SIZE)
+    status = 0
+    try:
+        for video in scraper.iter_videos(identifier, by_id, limit=limit or None):
+            if "error" in video:
+                print(f"{scraper.colorize('❌ Error:', C.BRIGHT_RED)} {video['error']}", file=sys.stderr)
+                status = 1
+                break
+            sink.write(video)
+    except BrokenPipeError:
+        # Downstream stopped reading (e.g. `| head`); discard the rest of the output
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        status = 1
+    except KeyboardInterrupt:
+        status = 130
+    finally:
+        sink.close()
+        scraper.close()
+    if output:
+        print(f"{scraper.colorize('🎬', C.BRIGHT_CYAN)} {sink.count} videos written to {output}", file=sys.stderr)
+    return status
+
+def query_identity(args):
+    """Answer --aliases from the identity index"""
+    scraper = TikTokScraper(use_colors=not args.no_color)
+    index = IdentityIndex(args.index)
+    accounts = index.aliases(args.aliases)
+    index.close()
+    if args.json:
+        print(json.dumps(accounts, indent=2))
+    elif not accounts:
+        print(f"{scraper.colorize('No indexed account matches', C.YELLOW)} {args.aliases}")
+    for account in ([] if args.json else accounts):
+        print(f"{scraper.colorize('User ID:', C.GREEN)} {account['user_id']}  {scraper.colorize('Current:', C.GREEN)} @{account['unique_id'] or 'unknown'}")
+        print(f"{scraper.colorize('SecUid:', C.GREEN)} {account['secUid'] or 'N/A'}")
+        for handle in account['handles']:
+            print(f"  @{handle['unique_id']:<30} {handle['first_seen'][:19]} → {handle['last_seen'][:19]}")
+        for rename in account['renames']:
+            print(f"  {scraper.colorize('Renamed', C.YELLOW)} @{rename['from']} → @{rename['to']} ({rename['detected_at'][:19]})")
+    scraper.close()
     return 0
 
 # ============================================